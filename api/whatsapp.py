@@ -1,6 +1,6 @@
-import json
 import logging
-from fastapi import APIRouter, Request, Form, Response
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Request, Form, Response
 from typing import Optional
 
 from services.agent_service import process_message, format_response_for_whatsapp
@@ -10,10 +10,18 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/whatsapp", tags=["WhatsApp"])
 
+# Réponse TwiML vide pour confirmer la réception (Twilio attend du XML valide)
+_TWIML_OK: bytes = b'<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+# Payload constant : octets écrits tels quels, sans sérialisation
+# (la Response est recréée à chaque appel, le middleware CORS la modifie)
+_HEALTH_BODY: bytes = b'{"status":"ok","service":"Agent Lynkia"}'
+
 
 @router.post("/webhook")
 async def receive_webhook(
     request: Request,
+    background_tasks: BackgroundTasks,
     From: str = Form(...),
     Body: str = Form(""),
     NumMedia: int = Form(0),
@@ -26,35 +34,46 @@ async def receive_webhook(
 
     Twilio envoie les messages entrants via POST avec form-data.
     """
-    logger.info(f"Received webhook from {From}: {Body[:50] if Body else '[media]'}...")
+    logger.info(
+        "Received webhook from %s: %s...", From, Body[:50] if Body else "[media]"
+    )
 
-    # Extraire le numéro de téléphone (format: whatsapp:+33612345678)
-    phone = From.replace("whatsapp:", "") if From.startswith("whatsapp:") else From
+    # Extraire le numéro de téléphone (format: whatsapp:+33612345678).
+    # Twilio préfixe toujours l'expéditeur par "whatsapp:" : un simple
+    # removeprefix suffit, aucune autre validation n'est nécessaire.
+    phone = From.removeprefix("whatsapp:")
 
     # Détecter si le message contient des médias
     has_media = NumMedia > 0
 
+    # Plusieurs médias : récupérer toutes les URLs (MediaUrl0..N)
+    media_urls = None
+    if NumMedia > 1:
+        media_urls = parse_incoming_webhook(await request.form())["media_urls"]
+
     # Traiter le message avec l'agent
-    response = process_message(
+    response = await process_message(
         phone=phone,
         message=Body,
         has_media=has_media,
-        media_url=MediaUrl0
+        media_url=MediaUrl0,
+        media_urls=media_urls
     )
 
-    logger.info(f"Agent response: {response}")
+    logger.info("Agent response: %s", response)
 
     # Formater la réponse pour WhatsApp (message lisible)
     whatsapp_message = format_response_for_whatsapp(response)
 
-    # Envoyer la réponse au technicien
-    await send_whatsapp_message(to=From, message=whatsapp_message)
+    # Envoyer la réponse au technicien en tâche de fond. Le gain de latence
+    # (TwiML renvoyé sans attendre l'envoi) ne vaut que sous uvicorn : sous
+    # Mangum, la tâche s'exécute dans l'appel ASGI et la réponse n'est rendue
+    # à API Gateway qu'après l'envoi (latence du webhook inchangée sur Lambda,
+    # mais message toujours envoyé avant le gel du conteneur).
+    background_tasks.add_task(send_whatsapp_message, to=From, message=whatsapp_message)
 
     # Retourner une réponse TwiML vide pour confirmer la réception
-    # Twilio attend une réponse XML valide
-    twiml_response = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
-
-    return Response(content=twiml_response, media_type="application/xml")
+    return Response(content=_TWIML_OK, media_type="application/xml")
 
 
 @router.post("/process")
@@ -69,16 +88,17 @@ async def process_direct(
 
     Utile pour les tests et l'intégration avec d'autres systèmes.
     """
-    response = process_message(
+    response = await process_message(
         phone=phone,
         message=message,
         has_media=has_media,
         media_url=media_url
     )
-    return response
+    # orjson direct : ORJSONResponse est déprécié dans FastAPI
+    return Response(content=orjson.dumps(response), media_type="application/json")
 
 
 @router.get("/health")
 async def health_check():
     """Endpoint de vérification de santé."""
-    return {"status": "ok", "service": "Agent Lynkia"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
@@ -1,8 +1,22 @@
-from pydantic_settings import BaseSettings
+import os
+from dataclasses import dataclass, fields
 from functools import lru_cache
 
 
-class Settings(BaseSettings):
+# Le fichier .env ne sert qu'en local : sur Lambda, la configuration
+# est fournie directement par les variables d'environnement
+if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    from dotenv import load_dotenv
+
+    load_dotenv(".env")
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
     # Twilio WhatsApp Configuration
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
@@ -13,20 +27,34 @@ class Settings(BaseSettings):
 
     # AWS Configuration
     dynamodb_table_name: str = ""
+    # Index creux des interventions actives (optionnel)
+    dynamodb_active_index: str = ""
     s3_bucket_name: str = ""
     aws_region_name: str = "eu-west-3"
 
     # Application Settings
     debug: bool = False
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Construit la configuration depuis les variables d'environnement.
+
+        Chaque champ est lu depuis la variable du même nom en majuscules
+        (ex: openai_api_key <- OPENAI_API_KEY), sinon sa valeur par défaut.
+        """
+        values = {}
+        for field in fields(cls):
+            raw = os.environ.get(field.name.upper())
+            if raw is None:
+                continue
+            values[field.name] = _parse_bool(raw) if field.type is bool else raw
+        return cls(**values)
 
 
 @lru_cache()
 def get_settings() -> Settings:
-    return Settings()
+    return Settings.from_env()
 
 
 settings = get_settings()
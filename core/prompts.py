@@ -1,4 +1,9 @@
-AGENT_SYSTEM_PROMPT = """Tu es un agent IA interne nommé "Agent Lynkia".
+from typing import Final
+
+# Prompt strictement statique (aucune interpolation, ni date ni téléphone) :
+# envoyé à l'identique à chaque appel, il sert de préfixe au cache de prompt
+# OpenAI. Les données variables vont uniquement dans le message utilisateur.
+AGENT_SYSTEM_PROMPT: Final[str] = """Tu es un agent IA interne nommé "Agent Lynkia".
 Tu interagis uniquement avec des techniciens terrain via WhatsApp.
 
 OBJECTIF
@@ -42,9 +42,38 @@ cp -r "$AGENT_DIR/services" "$AGENT_DIR/package/"
 cp "$AGENT_DIR/main.py" "$AGENT_DIR/package/"
 cp "$AGENT_DIR/handler.py" "$AGENT_DIR/package/"
 
-# Create ZIP
+# Precompile application code (prompts included) so Lambda does not recompile
+# it on every cold start: the deployment package is read-only at runtime.
+# unchecked-hash: the .pyc is used as-is, whatever the zip mtimes.
+# The bytecode must come from the Lambda runtime version (3.11): a
+# cpython-3XX.pyc from another interpreter would be ignored.
+LAMBDA_PYTHON_VERSION="3.11"
+PYC_PYTHON=""
+if command -v "python$LAMBDA_PYTHON_VERSION" >/dev/null 2>&1; then
+    PYC_PYTHON="python$LAMBDA_PYTHON_VERSION"
+elif [ "$(python3 -c 'import sys; print("%d.%d" % sys.version_info[:2])')" = "$LAMBDA_PYTHON_VERSION" ]; then
+    PYC_PYTHON="python3"
+fi
+
+if [ -n "$PYC_PYTHON" ]; then
+    "$PYC_PYTHON" -m compileall -q --invalidation-mode unchecked-hash \
+        "$AGENT_DIR/package/api" \
+        "$AGENT_DIR/package/core" \
+        "$AGENT_DIR/package/models" \
+        "$AGENT_DIR/package/services" \
+        "$AGENT_DIR/package/main.py" \
+        "$AGENT_DIR/package/handler.py"
+else
+    echo -e "${YELLOW}WARNING: Python $LAMBDA_PYTHON_VERSION not found, skipping bytecode precompilation${NC}"
+fi
+
+# Create ZIP (dependencies without bytecode, then application bytecode)
 cd "$AGENT_DIR/package"
 zip -r "$AGENT_DIR/lambda.zip" . -x "*.pyc" -x "__pycache__/*" -x "*.dist-info/*"
+if [ -n "$PYC_PYTHON" ]; then
+    zip -r "$AGENT_DIR/lambda.zip" api core models services \
+        __pycache__/main.*.pyc __pycache__/handler.*.pyc -i "*.pyc"
+fi
 cd "$AGENT_DIR"
 
 # Cleanup package directory
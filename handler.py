@@ -5,8 +5,20 @@ Ce fichier sert de point d'entrée pour le déploiement AWS Lambda.
 Mangum adapte l'application FastAPI pour fonctionner avec Lambda.
 """
 
+import asyncio
+
 from mangum import Mangum
 from main import app
+from services.agent_service import get_openai_client, process_message
+
+# Préchauffage pendant la phase d'init Lambda (hors latence des requêtes) :
+# création du client OpenAI et premier passage dans le parser.
+# "AIDE" ne déclenche aucun appel réseau ni écriture en base.
+# On utilise la boucle d'événements que Mangum réutilisera ensuite.
+get_openai_client()
+asyncio.get_event_loop().run_until_complete(
+    process_message(phone="+0", message="AIDE", has_media=False)
+)
 
 # Handler Lambda
 # lifespan="off" car Lambda ne supporte pas les événements de cycle de vie
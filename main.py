@@ -1,9 +1,11 @@
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.whatsapp import router as whatsapp_router
 from core.config import settings
+from services.whatsapp_service import close_client
 
 # Configuration du logging
 logging.basicConfig(
@@ -13,11 +15,21 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cycle de vie de l'application (hors Lambda : lifespan="off")."""
+    yield
+    # Fermeture des connexions keep-alive vers Twilio
+    await close_client()
+
+
 # Création de l'application FastAPI
 app = FastAPI(
     title="Agent Lynkia",
     description="Agent IA pour techniciens terrain via WhatsApp",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configuration CORS
@@ -33,20 +45,23 @@ app.add_middleware(
 app.include_router(whatsapp_router)
 
 
+# Corps constants : octets JSON écrits tels quels, sans sérialisation.
+# La Response est recréée à chaque appel : les middlewares (CORS) modifient
+# ses en-têtes en place.
+_ROOT_BODY = b'{"name":"Agent Lynkia","version":"1.0.0","status":"running"}'
+_HEALTH_BODY = b'{"status":"healthy"}'
+
+
 @app.get("/")
 async def root():
     """Endpoint racine."""
-    return {
-        "name": "Agent Lynkia",
-        "version": "1.0.0",
-        "status": "running",
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
     """Endpoint de santé global."""
-    return {"status": "healthy"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 if __name__ == "__main__":
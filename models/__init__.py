@@ -12,6 +12,7 @@ from .schemas import (
     HelpData,
     ErrorData,
 )
+from .fast_schemas import AgentResponseStruct, decode_agent_response
 
 __all__ = [
     "Action",
@@ -26,4 +27,6 @@ __all__ = [
     "SearchData",
     "HelpData",
     "ErrorData",
+    "AgentResponseStruct",
+    "decode_agent_response",
 ]
@@ -0,0 +1,129 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+import msgspec
+
+from .actions import Action
+
+
+# Miroirs msgspec des schémas pydantic, utilisés pour décoder et valider
+# la sortie (non fiable) du fallback OpenAI.
+
+
+class InterventionItemStruct(msgspec.Struct):
+    type: str
+    reference: str
+
+
+class InterventionDataStruct(msgspec.Struct):
+    type: str
+    reference: str
+    date: str = "TODAY"
+
+
+class BulkInterventionDataStruct(msgspec.Struct):
+    interventions: List[InterventionItemStruct]
+    date: str = "TODAY"
+
+
+class CommentDataStruct(msgspec.Struct):
+    reference: str
+    commentaire: str
+
+
+class ImageDataStruct(msgspec.Struct):
+    reference: str
+
+
+class UpdateDataStruct(msgspec.Struct):
+    reference: str
+    fields: Dict[str, Any]
+
+
+class DeleteDataStruct(msgspec.Struct):
+    reference: str
+
+
+class ListDataStruct(msgspec.Struct):
+    scope: str  # TODAY, MOIS, DATE
+    date: Optional[str] = None
+
+
+class SearchDataStruct(msgspec.Struct):
+    reference: str
+
+
+class HelpDataStruct(msgspec.Struct):
+    pass
+
+
+class ErrorDataStruct(msgspec.Struct):
+    message: str
+
+
+class AgentResponseStruct(msgspec.Struct):
+    action: Action
+    data: Dict[str, Any] = msgspec.field(default_factory=dict)
+
+
+DATA_STRUCTS = {
+    Action.CREATE_ONE: InterventionDataStruct,
+    Action.CREATE_BULK: BulkInterventionDataStruct,
+    Action.ADD_COMMENT: CommentDataStruct,
+    Action.ADD_IMAGE: ImageDataStruct,
+    Action.UPDATE: UpdateDataStruct,
+    Action.DELETE: DeleteDataStruct,
+    Action.LIST: ListDataStruct,
+    Action.SEARCH: SearchDataStruct,
+    Action.GET_IMAGES: ImageDataStruct,
+    Action.HELP: HelpDataStruct,
+    Action.ERROR: ErrorDataStruct,
+}
+
+
+_ACTION_RE = re.compile(rb'"action"\s*:\s*"([A-Z_]+)"')
+
+
+def quick_action_extract(content: Union[str, bytes]) -> Optional[str]:
+    """Repère la valeur de "action" sans parser le JSON complet."""
+    if isinstance(content, str):
+        content = content.encode()
+    match = _ACTION_RE.search(content)
+    return match.group(1).decode() if match else None
+
+
+def _to_agent_response(response: AgentResponseStruct) -> Dict[str, Any]:
+    data = msgspec.convert(response.data, type=DATA_STRUCTS[response.action])
+    return {"action": response.action.value, "data": msgspec.to_builtins(data)}
+
+
+def decode_agent_response(content: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Décode et valide une réponse JSON de l'agent.
+
+    Seuls "action" et "data" sont matérialisés : les autres clés sont
+    ignorées par msgspec sans être converties en objets Python. Un objet
+    JSON valide suivi de texte parasite est récupéré si une action y figure.
+
+    Lève msgspec.DecodeError si le JSON est invalide, et
+    msgspec.ValidationError si la structure ne correspond pas à l'action.
+
+    Returns:
+        Dict avec structure {"action": "...", "data": {...}}
+    """
+    try:
+        response = msgspec.json.decode(content, type=AgentResponseStruct)
+    except msgspec.ValidationError:
+        raise
+    except msgspec.DecodeError:
+        if quick_action_extract(content) is None:
+            raise
+        # Préfixe JSON valide suivi de texte parasite : ne garder que l'objet
+        text = content.decode() if isinstance(content, bytes) else content
+        try:
+            prefix, _ = json.JSONDecoder().raw_decode(text.lstrip())
+        except ValueError:
+            raise msgspec.DecodeError("JSON is malformed") from None
+        response = msgspec.convert(prefix, type=AgentResponseStruct)
+    return _to_agent_response(response)
@@ -1,127 +1,190 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any, Union
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Annotated, Optional, List, Dict, Any, Literal, Union
 from .actions import Action
 
 
-class InterventionItem(BaseModel):
+class _FrozenModel(BaseModel):
+    """Base immuable partagée par les schémas de l'agent."""
+
+    model_config = ConfigDict(frozen=True)
+
+
+class InterventionItem(_FrozenModel):
     type: str
     reference: str
 
 
-class InterventionData(BaseModel):
+class InterventionData(_FrozenModel):
+    kind: Literal["CREATE_ONE"] = Field("CREATE_ONE", exclude=True)
     date: str = "TODAY"
     type: str
     reference: str
 
 
-class BulkInterventionData(BaseModel):
+class BulkInterventionData(_FrozenModel):
+    kind: Literal["CREATE_BULK"] = Field("CREATE_BULK", exclude=True)
     date: str = "TODAY"
     interventions: List[InterventionItem]
 
 
-class CommentData(BaseModel):
+class CommentData(_FrozenModel):
+    kind: Literal["ADD_COMMENT"] = Field("ADD_COMMENT", exclude=True)
     reference: str
     commentaire: str
 
 
-class ImageData(BaseModel):
+class ImageData(_FrozenModel):
+    kind: Literal["ADD_IMAGE", "GET_IMAGES"] = Field("ADD_IMAGE", exclude=True)
     reference: str
 
 
-class UpdateData(BaseModel):
+class UpdateData(_FrozenModel):
+    kind: Literal["UPDATE"] = Field("UPDATE", exclude=True)
     reference: str
     fields: Dict[str, Any]
 
 
-class DeleteData(BaseModel):
+class DeleteData(_FrozenModel):
+    kind: Literal["DELETE"] = Field("DELETE", exclude=True)
     reference: str
 
 
-class ListData(BaseModel):
+class ListData(_FrozenModel):
+    kind: Literal["LIST"] = Field("LIST", exclude=True)
     scope: str  # TODAY, MOIS, DATE
     date: Optional[str] = None
 
 
-class SearchData(BaseModel):
+class SearchData(_FrozenModel):
+    kind: Literal["SEARCH"] = Field("SEARCH", exclude=True)
     reference: str
 
 
-class HelpData(BaseModel):
-    pass
+class HelpData(_FrozenModel):
+    kind: Literal["HELP"] = Field("HELP", exclude=True)
 
 
-class ErrorData(BaseModel):
+class ErrorData(_FrozenModel):
+    kind: Literal["ERROR"] = Field("ERROR", exclude=True)
     message: str
 
 
-class AgentResponse(BaseModel):
+class AgentResponse(_FrozenModel):
+    """
+    Réponse structurée de l'agent.
+
+    Les classmethods (create_one, create_bulk, ...) sont appelées avec des
+    données issues de notre propre parser : elles utilisent model_construct
+    et ne repassent pas par la validation pydantic. Pour une sortie non fiable
+    (fallback OpenAI), utiliser parse_untrusted.
+    """
+
     action: Action
-    data: Union[
-        InterventionData,
-        BulkInterventionData,
-        CommentData,
-        ImageData,
-        UpdateData,
-        DeleteData,
-        ListData,
-        SearchData,
-        HelpData,
-        ErrorData,
-        Dict[str, Any],
+    data: Annotated[
+        Union[
+            InterventionData,
+            BulkInterventionData,
+            CommentData,
+            ImageData,
+            UpdateData,
+            DeleteData,
+            ListData,
+            SearchData,
+            HelpData,
+            ErrorData,
+        ],
+        Field(discriminator="kind"),
     ]
 
+    @model_validator(mode="before")
+    @classmethod
+    def _tag_data(cls, values: Any) -> Any:
+        """Recopie l'action dans data["kind"] pour la validation discriminée."""
+        if isinstance(values, dict) and isinstance(values.get("data"), dict):
+            action = values.get("action")
+            data = values["data"]
+            if "kind" not in data and action is not None:
+                values = {
+                    **values,
+                    "data": {**data, "kind": getattr(action, "value", action)},
+                }
+        return values
+
+    @classmethod
+    def parse_untrusted(cls, payload: Dict[str, Any]) -> "AgentResponse":
+        """Valide une réponse externe (ex: sortie OpenAI)."""
+        return cls.model_validate(payload)
+
     @classmethod
     def create_one(cls, type: str, reference: str, date: str = "TODAY"):
-        return cls(
+        return cls.model_construct(
             action=Action.CREATE_ONE,
-            data=InterventionData(date=date, type=type, reference=reference),
+            data=InterventionData.model_construct(
+                date=date, type=type, reference=reference
+            ),
         )
 
     @classmethod
     def create_bulk(cls, interventions: List[dict], date: str = "TODAY"):
-        items = [InterventionItem(**i) for i in interventions]
-        return cls(
+        items = [InterventionItem.model_construct(**i) for i in interventions]
+        return cls.model_construct(
             action=Action.CREATE_BULK,
-            data=BulkInterventionData(date=date, interventions=items),
+            data=BulkInterventionData.model_construct(date=date, interventions=items),
         )
 
     @classmethod
     def add_comment(cls, reference: str, commentaire: str):
-        return cls(
+        return cls.model_construct(
             action=Action.ADD_COMMENT,
-            data=CommentData(reference=reference, commentaire=commentaire),
+            data=CommentData.model_construct(
+                reference=reference, commentaire=commentaire
+            ),
         )
 
     @classmethod
     def add_image(cls, reference: str):
-        return cls(action=Action.ADD_IMAGE, data=ImageData(reference=reference))
+        return cls.model_construct(
+            action=Action.ADD_IMAGE, data=ImageData.model_construct(reference=reference)
+        )
 
     @classmethod
     def update(cls, reference: str, fields: Dict[str, Any]):
-        return cls(
-            action=Action.UPDATE, data=UpdateData(reference=reference, fields=fields)
+        return cls.model_construct(
+            action=Action.UPDATE,
+            data=UpdateData.model_construct(reference=reference, fields=fields),
         )
 
     @classmethod
     def delete(cls, reference: str):
-        return cls(action=Action.DELETE, data=DeleteData(reference=reference))
+        return cls.model_construct(
+            action=Action.DELETE, data=DeleteData.model_construct(reference=reference)
+        )
 
     @classmethod
     def list_interventions(cls, scope: str, date: Optional[str] = None):
-        return cls(action=Action.LIST, data=ListData(scope=scope, date=date))
+        return cls.model_construct(
+            action=Action.LIST, data=ListData.model_construct(scope=scope, date=date)
+        )
 
     @classmethod
     def search(cls, reference: str):
-        return cls(action=Action.SEARCH, data=SearchData(reference=reference))
+        return cls.model_construct(
+            action=Action.SEARCH, data=SearchData.model_construct(reference=reference)
+        )
 
     @classmethod
     def get_images(cls, reference: str):
-        return cls(action=Action.GET_IMAGES, data=ImageData(reference=reference))
+        return cls.model_construct(
+            action=Action.GET_IMAGES,
+            data=ImageData.model_construct(kind="GET_IMAGES", reference=reference),
+        )
 
     @classmethod
     def help(cls):
-        return cls(action=Action.HELP, data=HelpData())
+        return cls.model_construct(action=Action.HELP, data=HelpData.model_construct())
 
     @classmethod
     def error(cls, message: str):
-        return cls(action=Action.ERROR, data=ErrorData(message=message))
+        return cls.model_construct(
+            action=Action.ERROR, data=ErrorData.model_construct(message=message)
+        )
@@ -0,0 +1,75 @@
+"""
+Rejoue des messages non parsés via l'API Batch d'OpenAI.
+
+Entrée : fichier JSONL, une ligne {"phone": "...", "message": "..."} par message.
+Sortie : une ligne JSON {"phone", "message", "action", "data"} par message sur stdout.
+
+Usage (depuis la racine du projet) :
+    python -m scripts.reprocess_unparsed messages.jsonl [--execute]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+import orjson
+
+from models.actions import Action
+from services.agent_service import call_openai_fallback_batch, execute_action
+
+logger = logging.getLogger(__name__)
+
+
+async def reprocess(path: str, execute: bool, poll_interval: float) -> None:
+    with open(path, "rb") as f:
+        jobs = [
+            (record["phone"], record["message"])
+            for record in map(orjson.loads, f)
+            if record.get("message")
+        ]
+
+    if not jobs:
+        logger.warning("No message to reprocess in %s", path)
+        return
+
+    results = await call_openai_fallback_batch(jobs, poll_interval=poll_interval)
+
+    for (phone, message), result in zip(jobs, results):
+        if execute and result.get("action") != Action.ERROR.value:
+            result = execute_action(
+                phone=phone,
+                action=Action(result["action"]),
+                data=result.get("data", {}),
+            )
+        sys.stdout.write(
+            orjson.dumps({"phone": phone, "message": message, **result}).decode()
+            + "\n"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="Fichier JSONL des messages à rejouer")
+    parser.add_argument(
+        "--execute",
+        action="store_true",
+        help="Exécuter les actions parsées en base (sinon parsing seul)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=30.0,
+        help="Délai en secondes entre deux vérifications du batch",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(reprocess(args.path, args.execute, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,69 @@
-import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import threading
+from typing import Callable, Dict, Any, Final, List, Optional, Tuple
+import msgspec
+import orjson
+from cachetools import TTLCache
+from openai import AsyncOpenAI
 
 from core.config import settings
 from core.prompts import AGENT_SYSTEM_PROMPT
 from models.actions import Action
+from models.fast_schemas import decode_agent_response
 from .intent_parser import parse_message, ParseResult
+from .fast_classifier import classify_message
 from . import intervention_service
 from . import image_service
 
 logger = logging.getLogger(__name__)
 
+# Valeurs d'action des chemins d'erreur/aide, résolues une seule fois
+_ERROR: Final = Action.ERROR.value
+_HELP: Final = Action.HELP.value
 
-def get_openai_client() -> Optional[OpenAI]:
-    """Retourne un client OpenAI si configuré."""
-    if settings.openai_api_key:
-        return OpenAI(api_key=settings.openai_api_key)
-    return None
+# Message système construit une seule fois : un préfixe identique à chaque appel
+# permet le cache de prompt automatique d'OpenAI (prompts >= 1024 tokens)
+_SYSTEM_MESSAGE = {"role": "system", "content": AGENT_SYSTEM_PROMPT}
 
+# Paramètres constants des appels chat.completions
+_CHAT_KWARGS: Dict[str, Any] = {
+    "model": "gpt-4o-mini",
+    "temperature": 0,
+    "max_tokens": 500,
+    "response_format": {"type": "json_object"},
+}
 
-def call_openai_fallback(message: str, phone: str) -> Dict[str, Any]:
+# Nombre maximal d'appels OpenAI simultanés par processus (rafales de messages)
+MESSAGE_CONCURRENCY = 8
+_openai_semaphore = asyncio.Semaphore(MESSAGE_CONCURRENCY)
+
+# Cache des réponses OpenAI par message : les formulations répétées des
+# techniciens ne refont pas d'aller-retour réseau
+_openai_cache: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+_openai_cache_lock = threading.Lock()
+
+
+def _openai_cache_key(message: str) -> bytes:
+    return hashlib.blake2b(message.encode(), digest_size=16).digest()
+
+
+_openai_client: Optional[AsyncOpenAI] = None
+_openai_client_lock = threading.Lock()
+
+
+def get_openai_client() -> Optional[AsyncOpenAI]:
+    """Retourne le client OpenAI du processus (créé une seule fois) si configuré."""
+    global _openai_client
+    if _openai_client is None and settings.openai_api_key:
+        with _openai_client_lock:
+            if _openai_client is None:
+                _openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _openai_client
+
+
+async def call_openai_fallback(message: str, phone: str) -> Dict[str, Any]:
     """
     Appelle OpenAI pour parser un message ambigu.
 
@@ -36,50 +79,343 @@ def call_openai_fallback(message: str, phone: str) -> Dict[str, Any]:
     if not client:
         logger.warning("OpenAI API key not configured, returning error")
         return {
-            "action": Action.ERROR.value,
+            "action": _ERROR,
             "data": {"message": "Service IA non disponible. Reformulez votre message."},
         }
 
+    cache_key = _openai_cache_key(message)
+    with _openai_cache_lock:
+        cached = _openai_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         user_message = f"[Technicien: {phone}]\n{message}"
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": AGENT_SYSTEM_PROMPT},
-                {"role": "user", "content": user_message},
-            ],
-            temperature=0,
-            max_tokens=500,
-            response_format={"type": "json_object"},
-        )
+        async with _openai_semaphore:
+            response = await client.chat.completions.create(
+                messages=[_SYSTEM_MESSAGE, {"role": "user", "content": user_message}],
+                **_CHAT_KWARGS,
+            )
 
         content = response.choices[0].message.content
-        result = json.loads(content)
-
-        # Valider la structure
-        if "action" not in result:
-            result = {
-                "action": Action.ERROR.value,
-                "data": {"message": "Réponse IA invalide"},
-            }
 
+        # Décoder et valider la structure en une passe
+        result = decode_agent_response(content)
+        with _openai_cache_lock:
+            _openai_cache[cache_key] = result
         return result
 
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error from OpenAI: {e}")
+    except msgspec.ValidationError as e:
+        logger.error("Invalid response structure from OpenAI: %s", e)
+        return {
+            "action": _ERROR,
+            "data": {"message": "Réponse IA invalide"},
+        }
+    except msgspec.DecodeError as e:
+        logger.error("JSON decode error from OpenAI: %s", e)
         return {
-            "action": Action.ERROR.value,
+            "action": _ERROR,
             "data": {"message": "Erreur de parsing de la réponse IA"},
         }
     except Exception as e:
-        logger.error(f"OpenAI API error: {e}")
+        logger.error("OpenAI API error: %s", e)
         return {
-            "action": Action.ERROR.value,
+            "action": _ERROR,
             "data": {"message": f"Erreur du service IA: {str(e)}"},
         }
 
 
+# Statuts terminaux d'un batch OpenAI
+_BATCH_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+async def call_openai_fallback_batch(
+    jobs: List[Tuple[str, str]],
+    poll_interval: float = 30.0
+) -> List[Dict[str, Any]]:
+    """
+    Parse des messages ambigus via l'API Batch d'OpenAI (traitement différé).
+
+    Réservé aux traitements hors ligne (rejeu d'historique, backfill) :
+    coût réduit de moitié, mais résultat sous 24h maximum. Le parcours
+    interactif reste sur call_openai_fallback.
+
+    Args:
+        jobs: Liste de (phone, message)
+        poll_interval: Délai en secondes entre deux vérifications du batch
+
+    Returns:
+        Liste de dicts {"action": "...", "data": {...}}, dans l'ordre des jobs
+    """
+    client = get_openai_client()
+    if not client:
+        logger.warning("OpenAI API key not configured, returning error")
+        return [
+            {
+                "action": _ERROR,
+                "data": {"message": "Service IA non disponible."},
+            }
+            for _ in jobs
+        ]
+
+    # Une requête chat.completions par ligne JSONL, identifiée par son index
+    payload = b"\n".join(
+        orjson.dumps({
+            "custom_id": str(index),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "messages": [
+                    _SYSTEM_MESSAGE,
+                    {"role": "user", "content": f"[Technicien: {phone}]\n{message}"},
+                ],
+                **_CHAT_KWARGS,
+            },
+        })
+        for index, (phone, message) in enumerate(jobs)
+    )
+
+    input_file = await client.files.create(
+        file=("batch.jsonl", payload), purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    logger.info("OpenAI batch %s submitted (%d jobs)", batch.id, len(jobs))
+
+    while batch.status not in _BATCH_FINAL_STATUSES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+
+    results: List[Dict[str, Any]] = [
+        {
+            "action": _ERROR,
+            "data": {"message": f"Batch IA non abouti: {batch.status}"},
+        }
+        for _ in jobs
+    ]
+    if batch.status != "completed" or not batch.output_file_id:
+        logger.error("OpenAI batch %s ended with status %s", batch.id, batch.status)
+        return results
+
+    output = await client.files.content(batch.output_file_id)
+    for line in output.content.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        index = int(record["custom_id"])
+        try:
+            body = record["response"]["body"]
+            content = body["choices"][0]["message"]["content"]
+            results[index] = decode_agent_response(content)
+        except msgspec.DecodeError as e:
+            logger.error("Invalid batch response for job %d: %s", index, e)
+            results[index] = {
+                "action": _ERROR,
+                "data": {"message": "Réponse IA invalide"},
+            }
+        except (KeyError, IndexError, TypeError) as e:
+            logger.error("Failed batch request for job %d: %s", index, e)
+            results[index] = {
+                "action": _ERROR,
+                "data": {"message": "Erreur du service IA"},
+            }
+
+    return results
+
+
+def _service_result(
+    result: Dict[str, Any],
+    action: Action,
+    success_fn: Callable[[Dict[str, Any]], Any],
+) -> Dict[str, Any]:
+    """
+    Convertit le résultat d'un service en réponse agent (ERROR si échec).
+
+    Les données de succès ne sont construites (via success_fn) que si le
+    service n'a pas renvoyé d'erreur.
+    """
+    if "error" in result:
+        return {"action": _ERROR, "data": {"message": result["error"]}}
+    return {"action": action.value, "data": success_fn(result)}
+
+
+def _handle_create_one(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.create_intervention(
+        phone=phone,
+        intervention_type=data.get("type", ""),
+        reference=data.get("reference", ""),
+        date=data.get("date")
+    )
+    return _service_result(
+        result, Action.CREATE_ONE, lambda r: r.get("intervention", data)
+    )
+
+
+def _handle_create_bulk(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.create_bulk_interventions(
+        phone=phone,
+        interventions=data.get("interventions", []),
+        date=data.get("date")
+    )
+    return _service_result(result, Action.CREATE_BULK, lambda r: {
+        "count": r.get("count", 0),
+        "interventions": r.get("created", [])
+    })
+
+
+def _handle_add_comment(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.add_comment(
+        phone=phone,
+        reference=data.get("reference", ""),
+        comment=data.get("comment", "")
+    )
+    return _service_result(result, Action.ADD_COMMENT, lambda r: data)
+
+
+def _handle_add_image(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    if not media_url:
+        return {
+            "action": _ERROR,
+            "data": {"message": "Aucune image detectee dans le message"}
+        }
+    result = image_service.upload_image(
+        phone=phone,
+        reference=data.get("reference", ""),
+        media_url=media_url
+    )
+    return _service_result(
+        result, Action.ADD_IMAGE, lambda r: {"reference": data.get("reference")}
+    )
+
+
+def _handle_update(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    fields = {}
+    if "new_type" in data:
+        fields["type"] = data["new_type"]
+    if "new_date" in data:
+        fields["date"] = data["new_date"]
+
+    result = intervention_service.update_intervention(
+        phone=phone,
+        reference=data.get("reference", ""),
+        fields=fields
+    )
+    return _service_result(result, Action.UPDATE, lambda r: data)
+
+
+def _handle_delete(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.delete_intervention(
+        phone=phone,
+        reference=data.get("reference", "")
+    )
+    return _service_result(
+        result, Action.DELETE, lambda r: {"reference": data.get("reference")}
+    )
+
+
+def _handle_list(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.list_interventions(
+        phone=phone,
+        scope=data.get("scope", "today"),
+        date=data.get("date")
+    )
+    return _service_result(result, Action.LIST, lambda r: {
+        "scope": r.get("scope"),
+        "count": r.get("count", 0),
+        "interventions": r.get("interventions", [])
+    })
+
+
+def _handle_search(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = intervention_service.get_intervention(
+        phone=phone,
+        reference=data.get("reference", "")
+    )
+    return _service_result(
+        result, Action.SEARCH, lambda r: r.get("intervention", {})
+    )
+
+
+def _handle_get_images(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    result = image_service.get_images(
+        phone=phone,
+        reference=data.get("reference", "")
+    )
+    return _service_result(result, Action.GET_IMAGES, lambda r: {
+        "reference": data.get("reference"),
+        "count": r.get("count", 0),
+        "images": r.get("images", [])
+    })
+
+
+def _handle_help(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    return {"action": _HELP, "data": data}
+
+
+def _handle_error(
+    phone: str, data: Dict[str, Any], media_url: Optional[str]
+) -> Dict[str, Any]:
+    return {"action": _ERROR, "data": data}
+
+
+async def _handle_add_images(
+    phone: str, data: Dict[str, Any], media_urls: List[str]
+) -> Dict[str, Any]:
+    """ADD_IMAGE avec plusieurs médias : uploads en parallèle."""
+    result = await image_service.upload_images(
+        phone=phone,
+        reference=data.get("reference", ""),
+        media_urls=media_urls
+    )
+    return _service_result(result, Action.ADD_IMAGE, lambda r: {
+        "reference": data.get("reference"),
+        "count": r.get("count", 0),
+        "errors": r.get("errors")
+    })
+
+
+_Handler = Callable[[str, Dict[str, Any], Optional[str]], Dict[str, Any]]
+
+# Table de dispatch action -> handler(phone, data, media_url)
+_DISPATCH: Dict[Action, _Handler] = {
+    Action.CREATE_ONE: _handle_create_one,
+    Action.CREATE_BULK: _handle_create_bulk,
+    Action.ADD_COMMENT: _handle_add_comment,
+    Action.ADD_IMAGE: _handle_add_image,
+    Action.UPDATE: _handle_update,
+    Action.DELETE: _handle_delete,
+    Action.LIST: _handle_list,
+    Action.SEARCH: _handle_search,
+    Action.GET_IMAGES: _handle_get_images,
+    Action.HELP: _handle_help,
+    Action.ERROR: _handle_error,
+}
+
+
 def execute_action(
     phone: str,
     action: Action,
@@ -98,189 +434,75 @@ def execute_action(
     Returns:
         Dict avec le resultat de l'execution
     """
-    try:
-        if action == Action.CREATE_ONE:
-            result = intervention_service.create_intervention(
-                phone=phone,
-                intervention_type=data.get("type", ""),
-                reference=data.get("reference", ""),
-                date=data.get("date")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": result.get("intervention", data)}
-
-        elif action == Action.CREATE_BULK:
-            interventions = data.get("interventions", [])
-            result = intervention_service.create_bulk_interventions(
-                phone=phone,
-                interventions=interventions,
-                date=data.get("date")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {
-                "action": action.value,
-                "data": {
-                    "count": result.get("count", 0),
-                    "interventions": result.get("created", [])
-                }
-            }
-
-        elif action == Action.ADD_COMMENT:
-            result = intervention_service.add_comment(
-                phone=phone,
-                reference=data.get("reference", ""),
-                comment=data.get("comment", "")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": data}
-
-        elif action == Action.ADD_IMAGE:
-            if not media_url:
-                return {
-                    "action": Action.ERROR.value,
-                    "data": {"message": "Aucune image detectee dans le message"}
-                }
-            result = image_service.upload_image(
-                phone=phone,
-                reference=data.get("reference", ""),
-                media_url=media_url
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": {"reference": data.get("reference")}}
-
-        elif action == Action.UPDATE:
-            fields = {}
-            if "new_type" in data:
-                fields["type"] = data["new_type"]
-            if "new_date" in data:
-                fields["date"] = data["new_date"]
-
-            result = intervention_service.update_intervention(
-                phone=phone,
-                reference=data.get("reference", ""),
-                fields=fields
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": data}
-
-        elif action == Action.DELETE:
-            result = intervention_service.delete_intervention(
-                phone=phone,
-                reference=data.get("reference", "")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": {"reference": data.get("reference")}}
-
-        elif action == Action.LIST:
-            result = intervention_service.list_interventions(
-                phone=phone,
-                scope=data.get("scope", "today"),
-                date=data.get("date")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {
-                "action": action.value,
-                "data": {
-                    "scope": result.get("scope"),
-                    "count": result.get("count", 0),
-                    "interventions": result.get("interventions", [])
-                }
-            }
-
-        elif action == Action.SEARCH:
-            result = intervention_service.get_intervention(
-                phone=phone,
-                reference=data.get("reference", "")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {"action": action.value, "data": result.get("intervention", {})}
-
-        elif action == Action.GET_IMAGES:
-            result = image_service.get_images(
-                phone=phone,
-                reference=data.get("reference", "")
-            )
-            if "error" in result:
-                return {"action": Action.ERROR.value, "data": {"message": result["error"]}}
-            return {
-                "action": action.value,
-                "data": {
-                    "reference": data.get("reference"),
-                    "count": result.get("count", 0),
-                    "images": result.get("images", [])
-                }
-            }
-
-        elif action == Action.HELP:
-            return {"action": action.value, "data": data}
-
-        elif action == Action.ERROR:
-            return {"action": action.value, "data": data}
-
-        else:
-            return {
-                "action": Action.ERROR.value,
-                "data": {"message": f"Action non supportee: {action.value}"}
-            }
+    handler = _DISPATCH.get(action)
+    if handler is None:
+        return {
+            "action": _ERROR,
+            "data": {"message": f"Action non supportee: {action.value}"}
+        }
 
+    try:
+        return handler(phone, data, media_url)
     except Exception as e:
-        logger.error(f"Error executing action {action}: {e}")
+        logger.error("Error executing action %s: %s", action, e)
         return {
-            "action": Action.ERROR.value,
+            "action": _ERROR,
             "data": {"message": f"Erreur d'execution: {str(e)}"}
         }
 
 
-def process_message(
+async def process_message(
     phone: str,
     message: str,
     has_media: bool = False,
-    media_url: Optional[str] = None
+    media_url: Optional[str] = None,
+    media_urls: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Traite un message de technicien et retourne une réponse JSON.
 
     Approche hybride:
     1. Essaie d'abord le parser basé sur les règles Python
-    2. Si ambigu, utilise OpenAI comme fallback
-    3. Execute l'action en base de donnees
+    2. Si ambigu, tente un classifieur local sans appel réseau
+    3. Sinon, utilise OpenAI comme fallback
+    4. Execute l'action en base de donnees
 
     Args:
         phone: Numéro WhatsApp du technicien
         message: Contenu du message
         has_media: True si le message contient une image/média
         media_url: URL de l'image Twilio (si presente)
+        media_urls: URLs de toutes les images Twilio (messages multi-médias)
 
     Returns:
         Dict avec structure {"action": "...", "data": {...}}
     """
-    logger.info(f"Processing message from {phone}: {message[:50]}...")
+    logger.info("Processing message from %s: %s...", phone, message[:50])
 
-    # Étape 1: Parser basé sur les règles
+    # Étape 1: Parser basé sur les règles (quelques µs de regex : exécuté
+    # directement, un passage par un thread coûterait plus cher)
     parse_result: ParseResult = parse_message(message, has_media=has_media)
 
     parsed_response = None
 
     if parse_result.success and not parse_result.ambiguous:
         # Parsing réussi avec les règles Python
-        logger.info(f"Rule-based parsing succeeded: {parse_result.action}")
+        logger.info("Rule-based parsing succeeded: %s", parse_result.action)
         parsed_response = {
             "action": parse_result.action,
             "data": parse_result.data or {},
         }
 
-    # Étape 2: Fallback vers OpenAI
+    # Étape 2: Classifieur local (fautes de frappe sur les commandes),
+    # sans appel réseau
+    elif parse_result.ambiguous and (local_result := classify_message(message)):
+        logger.info("Local classifier succeeded: %s", local_result["action"])
+        parsed_response = local_result
+
+    # Étape 3: Fallback vers OpenAI
     elif parse_result.ambiguous:
         logger.info("Message ambiguous, falling back to OpenAI")
-        openai_result = call_openai_fallback(message, phone)
+        openai_result = await call_openai_fallback(message, phone)
         try:
             action_str = openai_result.get("action", "ERROR")
             parsed_response = {
@@ -289,18 +511,32 @@ def process_message(
             }
         except ValueError:
             return {
-                "action": Action.ERROR.value,
+                "action": _ERROR,
                 "data": {"message": "Action non reconnue"},
             }
     else:
         # Cas par défaut: erreur
         return {
-            "action": Action.ERROR.value,
+            "action": _ERROR,
             "data": {"message": "Message non reconnu"},
         }
 
-    # Étape 3: Executer l'action en base de donnees
-    return execute_action(
+    # Étape 4: Executer l'action en base de donnees
+    # Plusieurs images : uploads en parallèle
+    if parsed_response["action"] == Action.ADD_IMAGE and len(media_urls or []) > 1:
+        try:
+            return await _handle_add_images(phone, parsed_response["data"], media_urls)
+        except Exception as e:
+            logger.error("Error executing action %s: %s", Action.ADD_IMAGE, e)
+            return {
+                "action": _ERROR,
+                "data": {"message": f"Erreur d'execution: {str(e)}"}
+            }
+
+    # Les services DynamoDB/S3/Twilio sont synchrones (boto3) : exécution
+    # dans un thread pour ne pas bloquer la boucle d'événements
+    return await asyncio.to_thread(
+        execute_action,
         phone=phone,
         action=parsed_response["action"],
         data=parsed_response["data"],
@@ -308,72 +544,7 @@ def process_message(
     )
 
 
-def format_response_for_whatsapp(response: Dict[str, Any]) -> str:
-    """
-    Formate la réponse JSON pour envoi WhatsApp (optionnel).
-
-    Pour debug ou confirmation, on peut envoyer un résumé lisible.
-    """
-    action = response.get("action", "UNKNOWN")
-    data = response.get("data", {})
-
-    if action == Action.CREATE_ONE.value:
-        return f"✅ Intervention créée: {data.get('type')} - {data.get('reference')}"
-
-    elif action == Action.CREATE_BULK.value:
-        count = len(data.get("interventions", []))
-        return f"✅ {count} interventions créées"
-
-    elif action == Action.ADD_COMMENT.value:
-        return f"💬 Commentaire ajouté sur {data.get('reference')}"
-
-    elif action == Action.ADD_IMAGE.value:
-        return f"📸 Image ajoutée sur {data.get('reference')}"
-
-    elif action == Action.DELETE.value:
-        return f"🗑️ Intervention {data.get('reference')} supprimée"
-
-    elif action == Action.UPDATE.value:
-        return f"✏️ Intervention {data.get('reference')} modifiée"
-
-    elif action == Action.LIST.value:
-        count = data.get("count", 0)
-        scope = data.get("scope", "today")
-        if count == 0:
-            return f"📋 Aucune intervention ({scope})"
-
-        lines = [f"📋 *{count} intervention(s)* ({scope}):"]
-        for i, interv in enumerate(data.get("interventions", [])[:10], 1):
-            lines.append(f"{i}. {interv.get('type', '')} - {interv.get('reference', '')}")
-        if count > 10:
-            lines.append(f"... et {count - 10} autres")
-        return "\n".join(lines)
-
-    elif action == Action.SEARCH.value:
-        if not data.get("reference"):
-            return "🔍 Intervention non trouvee"
-        lines = [f"🔍 *Intervention {data.get('reference')}*"]
-        lines.append(f"Type: {data.get('type', 'N/A')}")
-        lines.append(f"Date: {data.get('date', 'N/A')}")
-        comments_count = len(data.get("comments", []))
-        images_count = data.get("images_count", 0)
-        if comments_count > 0:
-            lines.append(f"Commentaires: {comments_count}")
-        if images_count > 0:
-            lines.append(f"Images: {images_count}")
-        return "\n".join(lines)
-
-    elif action == Action.GET_IMAGES.value:
-        count = data.get("count", 0)
-        if count == 0:
-            return f"🖼️ Aucune image pour {data.get('reference')}"
-        lines = [f"🖼️ *{count} image(s)* pour {data.get('reference')}:"]
-        for i, img in enumerate(data.get("images", [])[:5], 1):
-            lines.append(f"{i}. {img.get('url', '')[:50]}...")
-        return "\n".join(lines)
-
-    elif action == Action.HELP.value:
-        return """📖 *Aide Agent Lynkia*
+_HELP_TEXT: Final = """📖 *Aide Agent Lynkia*
 
 *Créer une intervention:*
 RAC IMMEUBLE 149041830
@@ -404,7 +575,136 @@ CHERCHER 149041830
 *Voir images:*
 IMAGES 149041830"""
 
-    elif action == Action.ERROR.value:
-        return f"❌ {data.get('message', 'Erreur inconnue')}"
 
-    return json.dumps(response, ensure_ascii=False)
+# Gabarits des réponses à format variable
+_LIST_EMPTY: Final = "📋 Aucune intervention ({scope})"
+_LIST_HEADER: Final = "📋 *{count} intervention(s)* ({scope}):"
+_LIST_ITEM: Final = "{index}. {type} - {reference}"
+_LIST_MORE: Final = "... et {remaining} autres"
+_LIST_MAX_ITEMS: Final = 10
+
+_SEARCH_NOT_FOUND: Final = "🔍 Intervention non trouvee"
+_SEARCH_HEADER: Final = "🔍 *Intervention {reference}*"
+_SEARCH_TYPE: Final = "Type: {type}"
+_SEARCH_DATE: Final = "Date: {date}"
+_SEARCH_COMMENTS: Final = "Commentaires: {count}"
+_SEARCH_IMAGES: Final = "Images: {count}"
+
+_IMAGES_EMPTY: Final = "🖼️ Aucune image pour {reference}"
+_IMAGES_HEADER: Final = "🖼️ *{count} image(s)* pour {reference}:"
+_IMAGES_ITEM: Final = "{index}. {url}..."
+_IMAGES_MAX_ITEMS: Final = 5
+
+_IMAGE_ADDED: Final = "📸 Image ajoutée sur {reference}"
+_IMAGES_ADDED: Final = "📸 {count} images ajoutées sur {reference}"
+_IMAGES_FAILED: Final = "⚠️ {count} image(s) non ajoutée(s):"
+_IMAGES_FAILED_ITEM: Final = "- {error}"
+
+
+def _format_list(data: Dict[str, Any]) -> str:
+    count = data.get("count", 0)
+    scope = data.get("scope", "today")
+    if count == 0:
+        return _LIST_EMPTY.format(scope=scope)
+
+    lines = [_LIST_HEADER.format(count=count, scope=scope)]
+    interventions = data.get("interventions", [])[:_LIST_MAX_ITEMS]
+    for i, interv in enumerate(interventions, 1):
+        lines.append(_LIST_ITEM.format(
+            index=i,
+            type=interv.get("type", ""),
+            reference=interv.get("reference", ""),
+        ))
+    if count > _LIST_MAX_ITEMS:
+        lines.append(_LIST_MORE.format(remaining=count - _LIST_MAX_ITEMS))
+    return "\n".join(lines)
+
+
+def _format_search(data: Dict[str, Any]) -> str:
+    if not data.get("reference"):
+        return _SEARCH_NOT_FOUND
+    lines = [
+        _SEARCH_HEADER.format(reference=data.get("reference")),
+        _SEARCH_TYPE.format(type=data.get("type", "N/A")),
+        _SEARCH_DATE.format(date=data.get("date", "N/A")),
+    ]
+    comments_count = len(data.get("comments", []))
+    images_count = data.get("images_count", 0)
+    if comments_count > 0:
+        lines.append(_SEARCH_COMMENTS.format(count=comments_count))
+    if images_count > 0:
+        lines.append(_SEARCH_IMAGES.format(count=images_count))
+    return "\n".join(lines)
+
+
+def _format_get_images(data: Dict[str, Any]) -> str:
+    count = data.get("count", 0)
+    reference = data.get("reference")
+    if count == 0:
+        return _IMAGES_EMPTY.format(reference=reference)
+    lines = [_IMAGES_HEADER.format(count=count, reference=reference)]
+    for i, img in enumerate(data.get("images", [])[:_IMAGES_MAX_ITEMS], 1):
+        lines.append(_IMAGES_ITEM.format(index=i, url=img.get("url", "")[:50]))
+    return "\n".join(lines)
+
+
+def _format_add_image(data: Dict[str, Any]) -> str:
+    count = data.get("count") or 1
+    template = _IMAGES_ADDED if count > 1 else _IMAGE_ADDED
+    lines = [template.format(count=count, reference=data.get("reference"))]
+    # Uploads multiples : signaler les images en échec
+    errors = data.get("errors") or []
+    if errors:
+        lines.append(_IMAGES_FAILED.format(count=len(errors)))
+        lines.extend(_IMAGES_FAILED_ITEM.format(error=error) for error in errors)
+    return "\n".join(lines)
+
+
+class _FormatData:
+    """Vue de data pour format_map : une clé absente vaut None (comme data.get)."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data.get(key)
+
+
+# Actions à format fixe : gabarits str.format_map
+_TEMPLATES: Final[Dict[str, str]] = {
+    Action.CREATE_ONE.value: "✅ Intervention créée: {type} - {reference}",
+    Action.ADD_COMMENT.value: "💬 Commentaire ajouté sur {reference}",
+    Action.DELETE.value: "🗑️ Intervention {reference} supprimée",
+    Action.UPDATE.value: "✏️ Intervention {reference} modifiée",
+}
+
+# Actions à format variable : formateurs dédiés
+_FORMATTERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    Action.CREATE_BULK.value: lambda d: (
+        f"✅ {len(d.get('interventions', []))} interventions créées"
+    ),
+    Action.ADD_IMAGE.value: _format_add_image,
+    Action.LIST.value: _format_list,
+    Action.SEARCH.value: _format_search,
+    Action.GET_IMAGES.value: _format_get_images,
+    _HELP: lambda d: _HELP_TEXT,
+    _ERROR: lambda d: f"❌ {d.get('message', 'Erreur inconnue')}",
+}
+
+
+def format_response_for_whatsapp(response: Dict[str, Any]) -> str:
+    """
+    Formate la réponse JSON pour envoi WhatsApp (optionnel).
+
+    Pour debug ou confirmation, on peut envoyer un résumé lisible.
+    """
+    action = response.get("action", "UNKNOWN")
+    template = _TEMPLATES.get(action)
+    if template is not None:
+        return template.format_map(_FormatData(response.get("data", {})))
+    formatter = _FORMATTERS.get(action)
+    if formatter is None:
+        return orjson.dumps(response, default=str).decode()
+    return formatter(response.get("data", {}))
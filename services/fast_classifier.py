@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from typing import Any, Dict, Optional, Tuple
+from models.actions import Action
+from .intent_parser import extract_reference
+
+
+# Classifieur local appelé avant le fallback OpenAI : il rattrape les verbes
+# de commande mal orthographiés ("rechercer", "lsite"...) en tête de message.
+# Il reste volontairement strict : un texte libre avec référence est un
+# commentaire pour OpenAI, et un participe ("trouvé la panne") ne doit pas
+# devenir une commande. Les suppressions ne sont jamais décidées localement.
+
+# Distance d'édition maximale (faute de frappe) entre le mot et le verbe
+MAX_TYPO_DISTANCE = 1
+
+# Verbes courts ("LISTE") : une lettre changée donne un vrai mot ("PISTE",
+# "LISSE"), seule une inversion de lettres ("LSITE") est acceptée
+SHORT_KEYWORD_LENGTH = 5
+
+# Tokens candidats : mots d'au moins 4 lettres
+_TOKEN_RE = re.compile(r"[A-Z']{4,}")
+
+_KEYWORDS: Tuple[Tuple[Action, str], ...] = (
+    (Action.SEARCH, "CHERCHER"),
+    (Action.SEARCH, "RECHERCHER"),
+    (Action.SEARCH, "TROUVER"),
+    (Action.SEARCH, "DETAIL"),
+    (Action.GET_IMAGES, "IMAGES"),
+    (Action.GET_IMAGES, "PHOTOS"),
+    (Action.LIST, "LISTE"),
+    (Action.LIST, "LISTER"),
+)
+
+_KEYWORD_ACTIONS: Dict[str, Action] = {
+    keyword: action for action, keyword in _KEYWORDS
+}
+
+# Actions dont la seule donnée requise est la référence
+_REFERENCE_ACTIONS = frozenset({Action.SEARCH, Action.GET_IMAGES})
+
+# Seuls mots admis après un verbe de liste (sinon : texte libre)
+_LIST_SCOPE_WORDS = frozenset({
+    "DU", "DE", "D'", "CE", "LE", "LA", "JOUR", "MOIS",
+    "AUJOURD'HUI", "AUJOURDHUI", "D'AUJOURD'HUI",
+})
+
+# Terminaisons conjuguées (participes) : "trouvé", "listée", "cherchés"...
+_CONJUGATED_RE = re.compile(r"(?:É|ÉE|ÉS|ÉES)$")
+
+
+def _strip_accents(text: str) -> str:
+    """Retire les accents d'un texte déjà en majuscules."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _typo_distance(a: str, b: str) -> int:
+    """Distance d'édition avec transpositions (Damerau restreinte)."""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if (
+                previous2 is not None
+                and i > 1 and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def classify(text: str) -> Optional[Tuple[Action, str]]:
+    """
+    Retourne (action, verbe) si le message commence par une faute de frappe
+    d'un verbe de commande, sinon None.
+
+    Les formes conjuguées (participes en -é, ou verbe en -er sans son "r")
+    sont rejetées : elles relèvent du texte libre. Pour les verbes courts,
+    seule une inversion de lettres est tolérée.
+    """
+    words = text.upper().replace("’", "'").split(maxsplit=1)
+    if not words or _CONJUGATED_RE.search(words[0]):
+        return None
+
+    token = _strip_accents(words[0])
+    if not _TOKEN_RE.fullmatch(token):
+        return None
+    token = token.replace("'", "")
+
+    exact = _KEYWORD_ACTIONS.get(token)
+    if exact is not None:
+        return exact, token
+
+    best: Optional[Tuple[Action, str]] = None
+    best_distance = MAX_TYPO_DISTANCE + 1
+    for action, keyword in _KEYWORDS:
+        # "TROUVE" / "CHERCHE" : présent ou participe sans accent
+        if keyword.endswith("ER") and token == keyword[:-1]:
+            return None
+        if len(keyword) <= SHORT_KEYWORD_LENGTH and sorted(token) != sorted(keyword):
+            continue
+        distance = _typo_distance(token, keyword)
+        if distance < best_distance:
+            best, best_distance = (action, keyword), distance
+    return best
+
+
+def classify_message(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Classe un message ambigu sans appel réseau, si la confiance le permet.
+
+    Returns:
+        Dict {"action": Action, "data": {...}} ou None (fallback OpenAI)
+    """
+    result = classify(text)
+    if result is None:
+        return None
+
+    action, _ = result
+
+    if action in _REFERENCE_ACTIONS:
+        # Référence cherchée après le verbe (le verbe lui-même ferait un
+        # code alphanumérique valide)
+        rest = text.split(maxsplit=1)[1:]
+        ref = extract_reference(rest[0]) if rest else None
+        if not ref:
+            return None
+        return {"action": action, "data": {"reference": ref}}
+
+    if action == Action.LIST:
+        # Liste seulement si le verbe n'est suivi que de mots de portée :
+        # "piste coupée 149041830" est un commentaire pour OpenAI
+        words = _strip_accents(text.upper().replace("’", "'")).split()[1:]
+        words = [word.strip(".,;:!?") for word in words]
+        if any(word and word not in _LIST_SCOPE_WORDS for word in words):
+            return None
+        scope = "MOIS" if "MOIS" in words else "TODAY"
+        return {"action": action, "data": {"scope": scope}}
+
+    return None
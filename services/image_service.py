@@ -1,9 +1,18 @@
+import asyncio
+import atexit
+import io
 import logging
+import mimetypes
+import threading
 import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional
 import httpx
 import boto3
+from cachetools import TTLCache
+from boto3.exceptions import S3UploadFailedError
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from core.config import settings
@@ -12,13 +21,41 @@ from .intervention_service import add_image_reference, get_image_references
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
 def get_s3_client():
-    """Retourne un client S3."""
+    """Retourne le client S3 du processus (cree une seule fois)."""
     if not settings.s3_bucket_name:
         logger.warning("S3 bucket name not configured")
         return None
 
-    return boto3.client("s3", region_name=settings.aws_region_name)
+    return boto3.client(
+        "s3",
+        region_name=settings.aws_region_name,
+        config=Config(max_pool_connections=50, retries={"mode": "standard"}),
+    )
+
+
+# Client HTTP Twilio partagé : les connexions keep-alive vers api.twilio.com
+# sont réutilisées d'une image à l'autre
+_TWILIO_LIMITS = httpx.Limits(max_keepalive_connections=20)
+_twilio_client: Optional[httpx.Client] = None
+_twilio_client_lock = threading.Lock()
+
+
+def _get_twilio_client() -> httpx.Client:
+    """Retourne le client HTTP synchrone Twilio (créé une seule fois)."""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                _twilio_client = httpx.Client(
+                    auth=(settings.twilio_account_sid, settings.twilio_auth_token),
+                    follow_redirects=True,
+                    timeout=30.0,
+                    limits=_TWILIO_LIMITS,
+                )
+                atexit.register(_twilio_client.close)
+    return _twilio_client
 
 
 def generate_s3_key(phone: str, reference: str, extension: str = "jpg") -> str:
@@ -29,118 +66,118 @@ def generate_s3_key(phone: str, reference: str, extension: str = "jpg") -> str:
     """
     # Nettoyer le numero de telephone
     clean_phone = phone.replace("whatsapp:", "").replace("+", "")
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     unique_id = str(uuid.uuid4())[:8]
 
     return f"{clean_phone}/{reference}/{timestamp}_{unique_id}.{extension}"
 
 
-async def download_image_from_twilio(media_url: str) -> Optional[bytes]:
-    """
-    Telecharge une image depuis l'URL Twilio.
+class _ChunkStream(io.RawIOBase):
+    """Expose un itérateur de blocs d'octets comme un fichier lisible."""
 
-    Args:
-        media_url: URL de l'image Twilio
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = b""
 
-    Returns:
-        Bytes de l'image ou None si erreur
-    """
-    if not settings.twilio_account_sid or not settings.twilio_auth_token:
-        logger.warning("Twilio credentials not configured")
-        return None
+    def readable(self) -> bool:
+        return True
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                media_url,
-                auth=(settings.twilio_account_sid, settings.twilio_auth_token),
-                follow_redirects=True,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.content
-    except Exception as e:
-        logger.error(f"Error downloading image from Twilio: {e}")
-        return None
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
 
 
-def download_image_from_twilio_sync(media_url: str) -> Optional[bytes]:
-    """
-    Telecharge une image depuis l'URL Twilio (version synchrone).
+DEFAULT_CONTENT_TYPE = "image/jpeg"
+DEFAULT_EXTENSION = "jpg"
 
-    Args:
-        media_url: URL de l'image Twilio
 
-    Returns:
-        Bytes de l'image ou None si erreur
-    """
-    if not settings.twilio_account_sid or not settings.twilio_auth_token:
-        logger.warning("Twilio credentials not configured")
-        return None
-
-    try:
-        with httpx.Client() as client:
-            response = client.get(
-                media_url,
-                auth=(settings.twilio_account_sid, settings.twilio_auth_token),
-                follow_redirects=True,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            return response.content
-    except Exception as e:
-        logger.error(f"Error downloading image from Twilio: {e}")
-        return None
+def extension_for_content_type(content_type: str) -> str:
+    """Deduit l'extension de fichier d'un type MIME (defaut: jpg)."""
+    mime = content_type.split(";", 1)[0].strip().lower()
+    extension = mimetypes.guess_extension(mime) if mime else None
+    return extension.lstrip(".") if extension else DEFAULT_EXTENSION
 
 
-def upload_image_to_s3(
-    image_data: bytes,
-    s3_key: str,
-    content_type: str = "image/jpeg"
+def stream_twilio_to_s3(
+    media_url: str,
+    phone: str,
+    reference: str
 ) -> Dict[str, Any]:
     """
-    Upload une image vers S3.
+    Transfere une image Twilio vers S3 en streaming.
+
+    Les octets passent de Twilio a S3 par blocs, sans charger l'image
+    entiere en memoire. Le type MIME et l'extension de la cle S3 sont
+    repris des en-tetes de la reponse Twilio.
 
     Args:
-        image_data: Bytes de l'image
-        s3_key: Cle S3 de destination
-        content_type: Type MIME de l'image
+        media_url: URL de l'image Twilio
+        phone: Numero WhatsApp du technicien
+        reference: Reference de l'intervention
 
     Returns:
-        Dict avec le resultat
+        Dict avec le resultat (s3_key, content_type)
     """
+    if not settings.twilio_account_sid or not settings.twilio_auth_token:
+        logger.warning("Twilio credentials not configured")
+        return {"error": "Impossible de telecharger l'image"}
+
     s3_client = get_s3_client()
     if not s3_client:
         return {"error": "S3 non configure"}
 
     try:
-        s3_client.put_object(
-            Bucket=settings.s3_bucket_name,
-            Key=s3_key,
-            Body=image_data,
-            ContentType=content_type
-        )
-        logger.info(f"Image uploaded to S3: {s3_key}")
-        return {"success": True, "s3_key": s3_key}
-    except ClientError as e:
+        with _get_twilio_client().stream("GET", media_url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type") or DEFAULT_CONTENT_TYPE
+            s3_key = generate_s3_key(
+                phone, reference, extension_for_content_type(content_type)
+            )
+            body = io.BufferedReader(_ChunkStream(response.iter_bytes()))
+            s3_client.upload_fileobj(
+                body,
+                settings.s3_bucket_name,
+                s3_key,
+                ExtraArgs={"ContentType": content_type}
+            )
+        logger.info(f"Image streamed to S3: {s3_key}")
+        return {"success": True, "s3_key": s3_key, "content_type": content_type}
+    except httpx.HTTPError as e:
+        logger.error(f"Error downloading image from Twilio: {e}")
+        return {"error": "Impossible de telecharger l'image"}
+    except (ClientError, S3UploadFailedError) as e:
         logger.error(f"S3 upload error: {e}")
         return {"error": f"Erreur upload S3: {str(e)}"}
 
 
-def get_presigned_url(s3_key: str, expiration: int = 3600) -> Optional[str]:
-    """
-    Genere une URL presignee pour acceder a une image S3.
+# URLs presignees mises en cache 55 min : une URL servie depuis le cache
+# reste donc valide au moins 5 min (validite minimale de 1h)
+_PRESIGN_CACHE_TTL = 55 * 60
+_PRESIGN_MIN_EXPIRATION = 3600
+_presign_cache: TTLCache = TTLCache(maxsize=10000, ttl=_PRESIGN_CACHE_TTL)
+_presign_cache_lock = threading.Lock()
 
-    Args:
-        s3_key: Cle S3 de l'image
-        expiration: Duree de validite en secondes (defaut: 1h)
 
-    Returns:
-        URL presignee ou None si erreur
-    """
-    s3_client = get_s3_client()
-    if not s3_client:
-        return None
+def _generate_presigned_url(
+    s3_client,
+    s3_key: str,
+    expiration: int = 3600
+) -> Optional[str]:
+    """Signe une URL avec un client S3 deja construit (avec cache)."""
+    cacheable = expiration >= _PRESIGN_MIN_EXPIRATION
+    cache_key = (s3_key, expiration)
+    if cacheable:
+        with _presign_cache_lock:
+            url = _presign_cache.get(cache_key)
+        if url is not None:
+            return url
 
     try:
         url = s3_client.generate_presigned_url(
@@ -151,6 +188,9 @@ def get_presigned_url(s3_key: str, expiration: int = 3600) -> Optional[str]:
             },
             ExpiresIn=expiration
         )
+        if cacheable:
+            with _presign_cache_lock:
+                _presign_cache[cache_key] = url
         return url
     except ClientError as e:
         logger.error(f"Error generating presigned URL: {e}")
@@ -174,22 +214,14 @@ def upload_image(
     Returns:
         Dict avec le resultat
     """
-    # 1. Telecharger l'image depuis Twilio
-    image_data = download_image_from_twilio_sync(media_url)
-    if not image_data:
-        return {"error": "Impossible de telecharger l'image"}
-
-    # 2. Generer la cle S3
-    # Detecter l'extension depuis le content-type si possible
-    extension = "jpg"  # Default
-    s3_key = generate_s3_key(phone, reference, extension)
-
-    # 3. Upload vers S3
-    upload_result = upload_image_to_s3(image_data, s3_key)
+    # 1. Transferer l'image de Twilio vers S3 en streaming
+    # (cle S3 et type MIME deduits du content-type Twilio)
+    upload_result = stream_twilio_to_s3(media_url, phone, reference)
     if "error" in upload_result:
         return upload_result
+    s3_key = upload_result["s3_key"]
 
-    # 4. Mettre a jour DynamoDB
+    # 2. Mettre a jour DynamoDB
     db_result = add_image_reference(phone, reference, s3_key)
     if "error" in db_result:
         return db_result
@@ -202,6 +234,46 @@ def upload_image(
     }
 
 
+async def upload_images(
+    phone: str,
+    reference: str,
+    media_urls: List[str]
+) -> Dict[str, Any]:
+    """
+    Ajoute plusieurs images a une intervention en parallele.
+
+    Chaque image suit le meme pipeline que upload_image (Twilio -> S3 ->
+    DynamoDB) dans un thread dedie : les allers-retours reseau se recouvrent
+    au lieu de s'enchainer.
+
+    Args:
+        phone: Numero WhatsApp du technicien
+        reference: Reference de l'intervention
+        media_urls: URLs des images Twilio
+
+    Returns:
+        Dict avec le resultat
+    """
+    results = await asyncio.gather(*[
+        asyncio.to_thread(upload_image, phone, reference, media_url)
+        for media_url in media_urls
+    ])
+
+    s3_keys = [r["s3_key"] for r in results if "error" not in r]
+    errors = [r["error"] for r in results if "error" in r]
+    if not s3_keys:
+        return {"error": errors[0] if errors else "Aucune image a ajouter"}
+
+    return {
+        "success": True,
+        "reference": reference,
+        "count": len(s3_keys),
+        "s3_keys": s3_keys,
+        "errors": errors if errors else None,
+        "message": f"{len(s3_keys)} image(s) ajoutee(s) avec succes"
+    }
+
+
 def get_images(phone: str, reference: str) -> Dict[str, Any]:
     """
     Recupere les URLs presignees des images d'une intervention.
@@ -228,12 +300,16 @@ def get_images(phone: str, reference: str) -> Dict[str, Any]:
             "message": "Aucune image pour cette intervention"
         }
 
-    # 2. Generer les URLs presignees
+    # 2. Generer les URLs presignees (un seul client S3 pour tout le lot)
+    s3_client = get_s3_client()
+    if not s3_client:
+        return {"error": "S3 non configure"}
+
     image_urls = []
     for img in images:
         s3_key = img.get("s3_key")
         if s3_key:
-            url = get_presigned_url(s3_key)
+            url = _generate_presigned_url(s3_client, s3_key)
             if url:
                 image_urls.append({
                     "url": url,
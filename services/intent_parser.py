@@ -1,10 +1,11 @@
 import re
 from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Set
 from models.actions import Action
 
 
-@dataclass
+@dataclass(slots=True)
 class ParseResult:
     success: bool
     action: Optional[Action] = None
@@ -24,125 +25,213 @@ INTERVENTION_TYPES = [
     "INSTALLATION",
 ]
 
+# Ordre de recherche effectif : un type qui contient un type prioritaire
+# (ex: RACCORDEMENT contient RAC) ne peut jamais être retenu, on l'écarte
+_TYPE_SEARCH_ORDER = tuple(
+    itype
+    for i, itype in enumerate(INTERVENTION_TYPES)
+    if not any(prev in itype for prev in INTERVENTION_TYPES[:i])
+)
+
 # Pattern pour détecter une référence (numérique ou alphanumérique)
 REFERENCE_PATTERN = r"\b([A-Za-z0-9]{6,15})\b"
 
 # Pattern pour les dates (DD/MM/YYYY ou YYYY-MM-DD)
 DATE_PATTERN = r"(\d{2}/\d{2}/\d{4}|\d{4}-\d{2}-\d{2})"
 
+# Regex statiques compilées une seule fois, à l'import du module
+# Référence : nombre long (groupe 1) ou code alphanumérique (groupe 2)
+_RE_REF = re.compile(r"\b(?:(\d{6,15})|([A-Z0-9]{6,15}))\b")
+_RE_DATE_DMY = re.compile(r"(\d{2})/(\d{2})/(\d{4})")
+_RE_DATE_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_RE_TYPE = re.compile(r"TYPE\s+([A-Z\s]+)")
+
+# Mots-clés par intention
+HELP_KEYWORDS = ["AIDE", "HELP", "AIDEZ", "AIDER", "COMMENT", "?"]
+DELETE_KEYWORDS = ["SUPPRIMER", "ANNULER", "SUPPR", "DELETE", "EFFACER"]
+UPDATE_KEYWORDS = ["MODIFIER", "CORRIGER", "CHANGER", "UPDATE", "MODIF"]
+LIST_KEYWORDS = ["AUJOURD'HUI", "AUJOURDHUI", "MOIS", "LISTE", "LISTER"]
+SEARCH_KEYWORDS = ["CHERCHER", "RECHERCHER", "VOIR", "DETAIL", "DÉTAIL", "TROUVER"]
+GET_IMAGES_KEYWORDS = ["IMAGES", "PHOTOS"]
+ADD_IMAGE_KEYWORDS = ["PHOTO", "IMAGE", "📸", "📷", "🖼"]
+
+
+def _alternation(keywords: List[str]) -> str:
+    """Construit une alternance regex, mots-clés les plus longs en premier."""
+    return "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+
+
+# Mots-clés de listing ("LISTER" contient "LISTE")
+_TODAY_TOKENS = frozenset(("AUJOURD'HUI", "AUJOURDHUI"))
+_LIST_RE = re.compile(r"AUJOURD'?HUI|MOIS|LISTE")
+
+# Une regex par intention pour les détecteurs appelés isolément
+_HELP_RE = re.compile(_alternation(HELP_KEYWORDS))
+_DELETE_RE = re.compile(_alternation(DELETE_KEYWORDS))
+_UPDATE_RE = re.compile(_alternation(UPDATE_KEYWORDS))
+_SEARCH_RE = re.compile(_alternation(SEARCH_KEYWORDS))
+_GET_IMAGES_RE = re.compile(_alternation(GET_IMAGES_KEYWORDS))
+_ADD_IMAGE_RE = re.compile(_alternation(ADD_IMAGE_KEYWORDS))
+
+# Une seule regex pour tous les mots-clés, groupes nommés par action et rangés
+# par priorité. Le lookahead rend chaque match de largeur nulle : finditer
+# teste toutes les positions et remonte aussi les mots-clés qui se chevauchent.
+_INTENT_RE = re.compile(
+    "(?="
+    + "|".join(
+        f"(?P<{action.value}>{_alternation(keywords)})"
+        for action, keywords in (
+            (Action.HELP, HELP_KEYWORDS),
+            (Action.DELETE, DELETE_KEYWORDS),
+            (Action.UPDATE, UPDATE_KEYWORDS),
+            (Action.LIST, LIST_KEYWORDS),
+            (Action.SEARCH, SEARCH_KEYWORDS),
+            (Action.GET_IMAGES, GET_IMAGES_KEYWORDS),
+            (Action.ADD_IMAGE, ADD_IMAGE_KEYWORDS),
+        )
+    )
+    + ")"
+)
+
 
 def normalize_text(text: str) -> str:
     """Normalise le texte pour faciliter la détection."""
     return text.strip().upper()
 
 
-def extract_reference(text: str) -> Optional[str]:
-    """Extrait une référence d'intervention du texte."""
-    # Cherche d'abord un nombre long (type référence)
-    numbers = re.findall(r"\b(\d{6,15})\b", text)
-    if numbers:
-        return numbers[0]
+def detect_intents(text: str, text_upper: Optional[str] = None) -> Set[str]:
+    """Retourne les actions dont un mot-clé apparaît dans le texte (un seul scan)."""
+    if text_upper is None:
+        text_upper = normalize_text(text)
+    return {match.lastgroup for match in _INTENT_RE.finditer(text_upper)}
 
-    # Sinon cherche un pattern alphanumérique
-    alphanums = re.findall(r"\b([A-Z0-9]{6,15})\b", text.upper())
-    if alphanums:
-        return alphanums[0]
 
-    return None
+def extract_reference(text: str) -> Optional[str]:
+    """Extrait une référence d'intervention du texte."""
+    # Un seul parcours du texte en majuscules (les chiffres sont inchangés) :
+    # le premier nombre long gagne, sinon le premier code alphanumérique
+    alphanum = None
+    for match in _RE_REF.finditer(text.upper()):
+        number, code = match.groups()
+        if number:
+            return number
+        if alphanum is None:
+            alphanum = code
+    return alphanum
 
 
 def extract_date(text: str) -> Optional[str]:
     """Extrait une date du texte."""
     # Format DD/MM/YYYY
-    match = re.search(r"(\d{2})/(\d{2})/(\d{4})", text)
+    match = _RE_DATE_DMY.search(text)
     if match:
         day, month, year = match.groups()
         return f"{year}-{month}-{day}"
 
     # Format YYYY-MM-DD
-    match = re.search(r"(\d{4})-(\d{2})-(\d{2})", text)
+    match = _RE_DATE_ISO.search(text)
     if match:
         return match.group(0)
 
     return None
 
 
-def extract_intervention_type(text: str) -> Optional[str]:
+def extract_intervention_type(
+    text: str, text_upper: Optional[str] = None
+) -> Optional[str]:
     """Extrait le type d'intervention du texte."""
-    text_upper = text.upper()
+    if text_upper is None:
+        text_upper = text.upper()
 
-    # Vérifier les types connus
-    for itype in INTERVENTION_TYPES:
+    # Vérifier les types connus, par priorité (quelques "in" en C restent
+    # plus rapides qu'une regex sur des messages aussi courts)
+    for itype in _TYPE_SEARCH_ORDER:
         if itype in text_upper:
             return itype
 
     return None
 
 
+def _reference_data(text: str) -> Optional[Dict[str, Any]]:
+    """Données {"reference": ...} des actions qui n'attendent qu'une référence."""
+    ref = extract_reference(text)
+    if ref:
+        return {"reference": ref}
+    return None
+
+
 def detect_help(text: str) -> bool:
     """Détecte une demande d'aide."""
-    keywords = ["AIDE", "HELP", "AIDEZ", "AIDER", "COMMENT", "?"]
     text_upper = normalize_text(text)
-    return any(kw in text_upper for kw in keywords) and len(text) < 50
+    return _HELP_RE.search(text_upper) is not None and len(text) < 50
 
 
 def detect_delete(text: str) -> Optional[Dict[str, Any]]:
     """Détecte une demande de suppression."""
-    keywords = ["SUPPRIMER", "ANNULER", "SUPPR", "DELETE", "EFFACER"]
     text_upper = normalize_text(text)
 
-    if any(kw in text_upper for kw in keywords):
-        ref = extract_reference(text)
-        if ref:
-            return {"reference": ref}
+    if _DELETE_RE.search(text_upper):
+        return _reference_data(text)
     return None
 
 
 def detect_update(text: str) -> Optional[Dict[str, Any]]:
     """Détecte une demande de modification."""
-    keywords = ["MODIFIER", "CORRIGER", "CHANGER", "UPDATE", "MODIF"]
     text_upper = normalize_text(text)
 
-    if any(kw in text_upper for kw in keywords):
-        ref = extract_reference(text)
-        if ref:
-            # Cherche le champ à modifier
-            fields = {}
-
-            # Cherche un nouveau type
-            new_type = None
-            type_match = re.search(r"TYPE\s+([A-Z\s]+)", text_upper)
-            if type_match:
-                potential_type = type_match.group(1).strip()
-                for itype in INTERVENTION_TYPES:
-                    if itype in potential_type:
-                        new_type = itype
-                        break
-                if not new_type and potential_type:
-                    new_type = potential_type.split()[0]
-
-            if new_type:
-                fields["type"] = new_type
-
-            if fields:
-                return {"reference": ref, "fields": fields}
-            else:
-                # Modification demandée mais champs non spécifiés
-                return None
+    if _UPDATE_RE.search(text_upper):
+        return _update_data(text, text_upper)
     return None
 
 
-def detect_list(text: str) -> Optional[Dict[str, Any]]:
+def _update_data(text: str, text_upper: str) -> Optional[Dict[str, Any]]:
+    """Référence et champs d'une modification (mot-clé déjà détecté)."""
+    ref = extract_reference(text)
+    if not ref:
+        return None
+
+    # Cherche le champ à modifier
+    fields = {}
+
+    # Cherche un nouveau type
+    new_type = None
+    type_match = _RE_TYPE.search(text_upper)
+    if type_match:
+        potential_type = type_match.group(1).strip()
+        for itype in _TYPE_SEARCH_ORDER:
+            if itype in potential_type:
+                new_type = itype
+                break
+        if not new_type and potential_type:
+            new_type = potential_type.split()[0]
+
+    if new_type:
+        fields["type"] = new_type
+
+    if fields:
+        return {"reference": ref, "fields": fields}
+    # Modification demandée mais champs non spécifiés
+    return None
+
+
+def detect_list(
+    text: str, text_upper: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """Détecte une demande de listing."""
-    text_upper = normalize_text(text)
+    if text_upper is None:
+        text_upper = normalize_text(text)
 
-    if "AUJOURD'HUI" in text_upper or "AUJOURDHUI" in text_upper:
+    # Un seul scan ; la priorité AUJOURD'HUI > MOIS > LISTE ne dépend pas
+    # de la position des mots-clés dans le message
+    found = set(_LIST_RE.findall(text_upper))
+
+    if found & _TODAY_TOKENS:
         return {"scope": "TODAY"}
 
-    if "MOIS" in text_upper:
+    if "MOIS" in found:
         return {"scope": "MOIS"}
 
-    if "LISTE" in text_upper or "LISTER" in text_upper:
+    if "LISTE" in found:
         date = extract_date(text)
         if date:
             return {"scope": "DATE", "date": date}
@@ -153,34 +242,27 @@ def detect_list(text: str) -> Optional[Dict[str, Any]]:
 
 def detect_search(text: str) -> Optional[Dict[str, Any]]:
     """Détecte une demande de recherche."""
-    keywords = ["CHERCHER", "RECHERCHER", "VOIR", "DETAIL", "DÉTAIL", "TROUVER"]
     text_upper = normalize_text(text)
 
-    if any(kw in text_upper for kw in keywords):
-        ref = extract_reference(text)
-        if ref:
-            return {"reference": ref}
+    if _SEARCH_RE.search(text_upper):
+        return _reference_data(text)
     return None
 
 
 def detect_get_images(text: str) -> Optional[Dict[str, Any]]:
     """Détecte une demande d'affichage d'images."""
-    keywords = ["IMAGES", "PHOTOS", "VOIR PHOTO", "VOIR IMAGE"]
     text_upper = normalize_text(text)
 
-    if any(kw in text_upper for kw in keywords):
-        ref = extract_reference(text)
-        if ref:
-            return {"reference": ref}
+    if _GET_IMAGES_RE.search(text_upper):
+        return _reference_data(text)
     return None
 
 
 def detect_add_image(text: str, has_media: bool = False) -> Optional[Dict[str, Any]]:
     """Détecte l'ajout d'une image."""
-    keywords = ["PHOTO", "IMAGE", "📸", "📷", "🖼"]
     text_upper = normalize_text(text)
 
-    if has_media or any(kw in text_upper for kw in keywords):
+    if has_media or _ADD_IMAGE_RE.search(text_upper):
         ref = extract_reference(text)
         if ref:
             return {"reference": ref}
@@ -190,6 +272,13 @@ def detect_add_image(text: str, has_media: bool = False) -> Optional[Dict[str, A
     return None
 
 
+@lru_cache(maxsize=512)
+def _comment_re(ref: str) -> re.Pattern:
+    """Regex "ref : commentaire", compilée une fois par référence."""
+    # La référence vient du message : échappée pour rester littérale
+    return re.compile(rf"{re.escape(ref)}\s*[:\-]\s*(.+)", re.IGNORECASE)
+
+
 def detect_add_comment(text: str) -> Optional[Dict[str, Any]]:
     """Détecte l'ajout d'un commentaire."""
     ref = extract_reference(text)
@@ -201,7 +290,7 @@ def detect_add_comment(text: str) -> Optional[Dict[str, Any]]:
     text_clean = text.strip()
 
     # Essaie de trouver le pattern "ref : commentaire"
-    match = re.search(rf"{ref}\s*[:\-]\s*(.+)", text_clean, re.IGNORECASE)
+    match = _comment_re(ref).search(text_clean)
     if match:
         comment = match.group(1).strip()
         if comment and len(comment) > 2:
@@ -210,32 +299,51 @@ def detect_add_comment(text: str) -> Optional[Dict[str, Any]]:
     return None
 
 
-def detect_create_bulk(text: str) -> Optional[Dict[str, Any]]:
+def detect_create_bulk(
+    text: str, text_upper: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """Détecte la création multiple d'interventions."""
-    lines = [l.strip() for l in text.strip().split("\n") if l.strip()]
+    text = text.strip()
+
+    # Cas le plus courant : message d'une seule ligne
+    if "\n" not in text:
+        return None
+
+    if text_upper is None:
+        text_upper = text.upper()
+
+    # Lignes d'origine et en majuscules, découpées en parallèle
+    lines = [
+        (line, line_upper)
+        for line, line_upper in zip(text.split("\n"), text_upper.split("\n"))
+        if line.strip()
+    ]
 
     if len(lines) < 2:
         return None
 
     interventions = []
-    date = extract_date(text) or "TODAY"
 
-    for line in lines:
-        itype = extract_intervention_type(line)
-        ref = extract_reference(line)
+    for line, line_upper in lines:
+        itype = extract_intervention_type(line, line_upper)
+        if not itype:
+            continue
 
-        if itype and ref:
+        ref = extract_reference(line)
+        if ref:
             interventions.append({"type": itype, "reference": ref})
 
     if len(interventions) >= 2:
-        return {"date": date, "interventions": interventions}
+        return {"date": extract_date(text) or "TODAY", "interventions": interventions}
 
     return None
 
 
-def detect_create_one(text: str) -> Optional[Dict[str, Any]]:
+def detect_create_one(
+    text: str, text_upper: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
     """Détecte la création d'une seule intervention."""
-    itype = extract_intervention_type(text)
+    itype = extract_intervention_type(text, text_upper)
     ref = extract_reference(text)
 
     if itype and ref:
@@ -271,9 +379,16 @@ def parse_message(text: str, has_media: bool = False) -> ParseResult:
         )
 
     text = text.strip()
+    # Majuscules calculées une seule fois et partagées par les détecteurs
+    text_upper = text.upper()
+
+    # Un seul scan pour repérer les mots-clés présents : les détecteurs dont
+    # aucun mot-clé n'apparaît ne sont pas appelés, et les autres passent
+    # directement à l'extraction sans rechercher à nouveau leurs mots-clés
+    intents = detect_intents(text, text_upper)
 
     # 1. HELP - Priorité haute
-    if detect_help(text):
+    if Action.HELP.value in intents and len(text) < 50:
         return ParseResult(success=True, action=Action.HELP, data={})
 
     # 2. Image avec ou sans référence
@@ -289,42 +404,42 @@ def parse_message(text: str, has_media: bool = False) -> ParseResult:
             )
 
     # 3. DELETE
-    result = detect_delete(text)
+    result = Action.DELETE.value in intents and _reference_data(text)
     if result:
         return ParseResult(success=True, action=Action.DELETE, data=result)
 
     # 4. UPDATE
-    result = detect_update(text)
+    result = Action.UPDATE.value in intents and _update_data(text, text_upper)
     if result:
         return ParseResult(success=True, action=Action.UPDATE, data=result)
 
     # 5. LIST
-    result = detect_list(text)
+    result = Action.LIST.value in intents and detect_list(text, text_upper)
     if result:
         return ParseResult(success=True, action=Action.LIST, data=result)
 
     # 6. SEARCH
-    result = detect_search(text)
+    result = Action.SEARCH.value in intents and _reference_data(text)
     if result:
         return ParseResult(success=True, action=Action.SEARCH, data=result)
 
     # 7. GET_IMAGES
-    result = detect_get_images(text)
+    result = Action.GET_IMAGES.value in intents and _reference_data(text)
     if result:
         return ParseResult(success=True, action=Action.GET_IMAGES, data=result)
 
     # 8. ADD_IMAGE (mot-clé sans média)
-    result = detect_add_image(text, has_media=False)
+    result = Action.ADD_IMAGE.value in intents and _reference_data(text)
     if result:
         return ParseResult(success=True, action=Action.ADD_IMAGE, data=result)
 
     # 9. CREATE_BULK (plusieurs lignes avec type+ref)
-    result = detect_create_bulk(text)
+    result = detect_create_bulk(text, text_upper)
     if result:
         return ParseResult(success=True, action=Action.CREATE_BULK, data=result)
 
     # 10. CREATE_ONE (une ligne avec type+ref)
-    result = detect_create_one(text)
+    result = detect_create_one(text, text_upper)
     if result:
         return ParseResult(success=True, action=Action.CREATE_ONE, data=result)
 
@@ -1,7 +1,11 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import itemgetter
 from typing import Dict, Any, List, Optional
 import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeSerializer
 from botocore.exceptions import ClientError
 
 from core.config import settings
@@ -9,8 +13,9 @@ from core.config import settings
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
 def get_dynamodb_table():
-    """Retourne la table DynamoDB."""
+    """Retourne la table DynamoDB du processus (creee une seule fois)."""
     if not settings.dynamodb_table_name:
         logger.warning("DynamoDB table name not configured")
         return None
@@ -19,6 +24,59 @@ def get_dynamodb_table():
     return dynamodb.Table(settings.dynamodb_table_name)
 
 
+@lru_cache(maxsize=1)
+def get_dynamodb_client():
+    """
+    Retourne le client DynamoDB bas niveau du processus (cree une seule fois).
+
+    Utilisé par les écritures fréquentes : il évite la couche resource.
+    Les valeurs doivent être sérialisées au préalable (voir _serialize).
+    """
+    if not settings.dynamodb_table_name:
+        logger.warning("DynamoDB table name not configured")
+        return None
+
+    return boto3.client("dynamodb", region_name=settings.aws_region_name)
+
+
+_serializer = TypeSerializer()
+
+
+def _serialize(values: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Convertit un dict Python au format typé DynamoDB ({"S": ...}, {"L": ...})."""
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+
+def _key(phone: str, reference: str) -> Dict[str, Dict[str, str]]:
+    """Clé primaire au format typé DynamoDB."""
+    return {"technicien_phone": {"S": phone}, "reference": {"S": reference}}
+
+
+# Clé de partition de l'index creux des interventions actives : l'attribut
+# ne porte le téléphone que tant que l'intervention est active
+ACTIVE_INDEX_KEY = "gsi_active_pk"
+
+# Condition des écritures sur une intervention existante et non supprimée
+_EXISTING_ACTIVE_CONDITION = "attribute_exists(#r) AND #s <> :deleted"
+
+
+def _is_condition_failure(error: ClientError) -> bool:
+    """True si l'écriture a été refusée par sa ConditionExpression."""
+    return error.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+def _missing_or_deleted(error: ClientError, reference: str) -> Dict[str, Any]:
+    """
+    Message d'erreur d'une écriture conditionnelle refusée.
+
+    Avec ReturnValuesOnConditionCheckFailure="ALL_OLD", l'item existant est
+    renvoyé dans l'erreur : son absence signifie que l'intervention n'existe pas.
+    """
+    if "Item" not in error.response:
+        return {"error": f"Intervention {reference} non trouvée"}
+    return {"error": f"Intervention {reference} a été supprimée"}
+
+
 def create_intervention(
     phone: str,
     intervention_type: str,
@@ -37,12 +95,13 @@ def create_intervention(
     Returns:
         Dict avec l'intervention créée ou erreur
     """
-    table = get_dynamodb_table()
-    if not table:
+    client = get_dynamodb_client()
+    if not client:
         return {"error": "Base de données non configurée"}
 
-    now = datetime.utcnow().isoformat()
-    intervention_date = date or datetime.utcnow().strftime("%Y-%m-%d")
+    current = datetime.now(timezone.utc)
+    now = current.isoformat()
+    intervention_date = date or current.strftime("%Y-%m-%d")
 
     item = {
         "technicien_phone": phone,
@@ -52,19 +111,20 @@ def create_intervention(
         "created_at": now,
         "updated_at": now,
         "status": "active",
+        ACTIVE_INDEX_KEY: phone,
         "comments": [],
         "images": []
     }
 
     try:
-        # Vérifier si l'intervention existe déjà
-        existing = table.get_item(
-            Key={"technicien_phone": phone, "reference": reference}
+        # Refusé en une seule requête si l'intervention existe déjà (active)
+        client.put_item(
+            TableName=settings.dynamodb_table_name,
+            Item=_serialize(item),
+            ConditionExpression="attribute_not_exists(#r) OR #s <> :active",
+            ExpressionAttributeNames={"#r": "reference", "#s": "status"},
+            ExpressionAttributeValues={":active": {"S": "active"}}
         )
-        if "Item" in existing and existing["Item"].get("status") == "active":
-            return {"error": f"L'intervention {reference} existe déjà"}
-
-        table.put_item(Item=item)
         logger.info(f"Intervention created: {reference} for {phone}")
 
         return {
@@ -76,10 +136,16 @@ def create_intervention(
             }
         }
     except ClientError as e:
+        if _is_condition_failure(e):
+            return {"error": f"L'intervention {reference} existe déjà"}
         logger.error(f"DynamoDB error: {e}")
         return {"error": f"Erreur base de données: {str(e)}"}
 
 
+# Nombre maximal d'items par requête BatchWriteItem
+_BATCH_SIZE = 25
+
+
 def create_bulk_interventions(
     phone: str,
     interventions: List[Dict[str, str]],
@@ -100,36 +166,58 @@ def create_bulk_interventions(
     if not table:
         return {"error": "Base de données non configurée"}
 
-    now = datetime.utcnow().isoformat()
-    intervention_date = date or datetime.utcnow().strftime("%Y-%m-%d")
-
-    created = []
-    errors = []
+    current = datetime.now(timezone.utc)
+    now = current.isoformat()
+    intervention_date = date or current.strftime("%Y-%m-%d")
 
+    # Une référence répétée n'est écrite (et comptée) qu'une fois : la
+    # dernière occurrence l'emporte, comme avec des put_item successifs
+    items: Dict[str, Dict[str, Any]] = {}
     for intervention in interventions:
         ref = intervention.get("reference")
-        int_type = intervention.get("type", "").upper()
-
         if not ref:
             continue
-
-        item = {
+        items[ref] = {
             "technicien_phone": phone,
             "reference": ref,
-            "type": int_type,
+            "type": intervention.get("type", "").upper(),
             "date": intervention_date,
             "created_at": now,
             "updated_at": now,
             "status": "active",
+            ACTIVE_INDEX_KEY: phone,
             "comments": [],
             "images": []
         }
 
+    created = []
+    errors = []
+
+    pending = list(items.values())
+    for start in range(0, len(pending), _BATCH_SIZE):
+        chunk = pending[start:start + _BATCH_SIZE]
         try:
-            table.put_item(Item=item)
-            created.append({"type": int_type, "reference": ref})
+            # Un batch_writer par lot de 25 : un seul BatchWriteItem (plus
+            # la relance des items non traités), l'échec est donc imputable
+            # aux seuls items de ce lot
+            with table.batch_writer() as batch:
+                for item in chunk:
+                    batch.put_item(Item=item)
         except ClientError as e:
-            errors.append({"reference": ref, "error": str(e)})
+            # Lot en échec : écriture item par item pour n'imputer l'erreur
+            # qu'aux items réellement refusés
+            logger.error(f"DynamoDB batch error: {e}")
+            for item in chunk:
+                try:
+                    table.put_item(Item=item)
+                    created.append({"type": item["type"], "reference": item["reference"]})
+                except ClientError as item_error:
+                    errors.append({"reference": item["reference"], "error": str(item_error)})
+            continue
+
+        created.extend(
+            {"type": item["type"], "reference": item["reference"]} for item in chunk
+        )
 
     return {
         "success": len(created) > 0,
@@ -203,45 +291,67 @@ def list_interventions(
         return {"error": "Base de données non configurée"}
 
     try:
-        # Récupérer toutes les interventions du technicien
-        response = table.query(
-            KeyConditionExpression="technicien_phone = :phone",
-            ExpressionAttributeValues={":phone": phone}
-        )
-
-        items = response.get("Items", [])
-
-        # Filtrer par statut actif
-        items = [i for i in items if i.get("status") == "active"]
-
-        # Filtrer par date selon le scope
-        today = datetime.utcnow().date()
+        # Borne de date du scope : (opérateur, valeur)
+        today = datetime.now(timezone.utc).date()
+        date_bound = None
 
         if scope == "today":
-            target_date = today.isoformat()
-            items = [i for i in items if i.get("date") == target_date]
+            date_bound = ("eq", today.isoformat())
         elif scope == "week":
             week_start = (today - timedelta(days=today.weekday())).isoformat()
-            items = [i for i in items if i.get("date", "") >= week_start]
+            date_bound = ("gte", week_start)
         elif scope == "month":
-            month_start = today.replace(day=1).isoformat()
-            items = [i for i in items if i.get("date", "") >= month_start]
+            date_bound = ("gte", today.replace(day=1).isoformat())
         elif date:
-            items = [i for i in items if i.get("date") == date]
+            date_bound = ("eq", date)
+
+        if settings.dynamodb_active_index:
+            # Index creux (ACTIVE_INDEX_KEY, date) : seuls les items actifs
+            # y figurent, la date est une condition de clé
+            key_condition = Key(ACTIVE_INDEX_KEY).eq(phone)
+            if date_bound:
+                operator, value = date_bound
+                key_condition &= getattr(Key("date"), operator)(value)
+            query_kwargs = {
+                "IndexName": settings.dynamodb_active_index,
+                "KeyConditionExpression": key_condition,
+            }
+        else:
+            # Sans index : filtres appliqués côté DynamoDB (la date n'est
+            # pas une clé de la table)
+            filter_expr = Attr("status").eq("active")
+            if date_bound:
+                operator, value = date_bound
+                filter_expr &= getattr(Attr("date"), operator)(value)
+            query_kwargs = {
+                "KeyConditionExpression": Key("technicien_phone").eq(phone),
+                "FilterExpression": filter_expr,
+            }
+
+        # Parcourir toutes les pages (1 Mo max par réponse)
+        items = []
+        while True:
+            response = table.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            query_kwargs["ExclusiveStartKey"] = last_key
 
         # Formater la réponse
-        interventions = []
-        for item in items:
-            interventions.append({
+        interventions = [
+            {
                 "type": item.get("type"),
                 "reference": item.get("reference"),
                 "date": item.get("date"),
                 "comments_count": len(item.get("comments", [])),
                 "images_count": len(item.get("images", []))
-            })
+            }
+            for item in items
+        ]
 
-        # Trier par date décroissante
-        interventions.sort(key=lambda x: x.get("date", ""), reverse=True)
+        # Trier par date décroissante ("date" est toujours présente ici)
+        interventions.sort(key=itemgetter("date"), reverse=True)
 
         return {
             "success": True,
@@ -275,36 +385,34 @@ def update_intervention(
         return {"error": "Base de données non configurée"}
 
     try:
-        # Vérifier que l'intervention existe
-        existing = table.get_item(
-            Key={"technicien_phone": phone, "reference": reference}
-        )
-        if "Item" not in existing:
-            return {"error": f"Intervention {reference} non trouvée"}
-
-        if existing["Item"].get("status") == "deleted":
-            return {"error": f"Intervention {reference} a été supprimée"}
-
         # Construire l'update expression
         update_parts = ["updated_at = :now"]
-        expr_values = {":now": datetime.utcnow().isoformat()}
+        expr_values = {
+            ":now": datetime.now(timezone.utc).isoformat(),
+            ":deleted": "deleted",
+        }
+        expr_names = {"#r": "reference", "#s": "status"}
 
         if "type" in fields:
             update_parts.append("#t = :type")
             expr_values[":type"] = fields["type"].upper()
+            expr_names["#t"] = "type"
 
         if "date" in fields:
             update_parts.append("#d = :date")
             expr_values[":date"] = fields["date"]
+            expr_names["#d"] = "date"
 
         update_expr = "SET " + ", ".join(update_parts)
-        expr_names = {"#t": "type", "#d": "date"}
 
+        # L'existence est vérifiée par la condition de l'écriture elle-même
         table.update_item(
             Key={"technicien_phone": phone, "reference": reference},
             UpdateExpression=update_expr,
+            ConditionExpression=_EXISTING_ACTIVE_CONDITION,
             ExpressionAttributeValues=expr_values,
-            ExpressionAttributeNames=expr_names
+            ExpressionAttributeNames=expr_names,
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
         )
 
         return {
@@ -313,6 +421,8 @@ def update_intervention(
             "updated_fields": list(fields.keys())
         }
     except ClientError as e:
+        if _is_condition_failure(e):
+            return _missing_or_deleted(e, reference)
         logger.error(f"DynamoDB error: {e}")
         return {"error": f"Erreur base de données: {str(e)}"}
 
@@ -333,21 +443,18 @@ def delete_intervention(phone: str, reference: str) -> Dict[str, Any]:
         return {"error": "Base de données non configurée"}
 
     try:
-        # Vérifier que l'intervention existe
-        existing = table.get_item(
-            Key={"technicien_phone": phone, "reference": reference}
-        )
-        if "Item" not in existing:
-            return {"error": f"Intervention {reference} non trouvée"}
-
-        # Soft delete
+        # Soft delete, refusé si l'intervention n'existe pas ; l'item sort
+        # de l'index des interventions actives
         table.update_item(
             Key={"technicien_phone": phone, "reference": reference},
-            UpdateExpression="SET #s = :status, updated_at = :now",
-            ExpressionAttributeNames={"#s": "status"},
+            UpdateExpression=(
+                f"SET #s = :status, updated_at = :now REMOVE {ACTIVE_INDEX_KEY}"
+            ),
+            ConditionExpression="attribute_exists(#r)",
+            ExpressionAttributeNames={"#r": "reference", "#s": "status"},
             ExpressionAttributeValues={
                 ":status": "deleted",
-                ":now": datetime.utcnow().isoformat()
+                ":now": datetime.now(timezone.utc).isoformat()
             }
         )
 
@@ -357,6 +464,8 @@ def delete_intervention(phone: str, reference: str) -> Dict[str, Any]:
             "deleted": True
         }
     except ClientError as e:
+        if _is_condition_failure(e):
+            return {"error": f"Intervention {reference} non trouvée"}
         logger.error(f"DynamoDB error: {e}")
         return {"error": f"Erreur base de données: {str(e)}"}
 
@@ -373,35 +482,31 @@ def add_comment(phone: str, reference: str, comment: str) -> Dict[str, Any]:
     Returns:
         Dict avec le résultat
     """
-    table = get_dynamodb_table()
-    if not table:
+    client = get_dynamodb_client()
+    if not client:
         return {"error": "Base de données non configurée"}
 
     try:
-        # Vérifier que l'intervention existe
-        existing = table.get_item(
-            Key={"technicien_phone": phone, "reference": reference}
-        )
-        if "Item" not in existing:
-            return {"error": f"Intervention {reference} non trouvée"}
-
-        if existing["Item"].get("status") == "deleted":
-            return {"error": f"Intervention {reference} a été supprimée"}
-
-        now = datetime.utcnow().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         comment_obj = {
             "text": comment,
             "created_at": now
         }
 
-        table.update_item(
-            Key={"technicien_phone": phone, "reference": reference},
+        # L'existence est vérifiée par la condition de l'écriture elle-même
+        client.update_item(
+            TableName=settings.dynamodb_table_name,
+            Key=_key(phone, reference),
             UpdateExpression="SET comments = list_append(if_not_exists(comments, :empty), :comment), updated_at = :now",
-            ExpressionAttributeValues={
+            ConditionExpression=_EXISTING_ACTIVE_CONDITION,
+            ExpressionAttributeNames={"#r": "reference", "#s": "status"},
+            ExpressionAttributeValues=_serialize({
                 ":comment": [comment_obj],
                 ":empty": [],
-                ":now": now
-            }
+                ":now": now,
+                ":deleted": "deleted"
+            }),
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
         )
 
         return {
@@ -410,6 +515,8 @@ def add_comment(phone: str, reference: str, comment: str) -> Dict[str, Any]:
             "comment": comment
         }
     except ClientError as e:
+        if _is_condition_failure(e):
+            return _missing_or_deleted(e, reference)
         logger.error(f"DynamoDB error: {e}")
         return {"error": f"Erreur base de données: {str(e)}"}
 
@@ -426,25 +533,26 @@ def add_image_reference(phone: str, reference: str, s3_key: str) -> Dict[str, An
     Returns:
         Dict avec le résultat
     """
-    table = get_dynamodb_table()
-    if not table:
+    client = get_dynamodb_client()
+    if not client:
         return {"error": "Base de données non configurée"}
 
     try:
-        now = datetime.utcnow().isoformat()
+        now = datetime.now(timezone.utc).isoformat()
         image_obj = {
             "s3_key": s3_key,
             "uploaded_at": now
         }
 
-        table.update_item(
-            Key={"technicien_phone": phone, "reference": reference},
+        client.update_item(
+            TableName=settings.dynamodb_table_name,
+            Key=_key(phone, reference),
             UpdateExpression="SET images = list_append(if_not_exists(images, :empty), :image), updated_at = :now",
-            ExpressionAttributeValues={
+            ExpressionAttributeValues=_serialize({
                 ":image": [image_obj],
                 ":empty": [],
                 ":now": now
-            }
+            })
         )
 
         return {"success": True, "s3_key": s3_key}
@@ -469,8 +577,12 @@ def get_image_references(phone: str, reference: str) -> Dict[str, Any]:
         return {"error": "Base de données non configurée"}
 
     try:
+        # Les images sont stockées en liste sur l'item : un seul GetItem,
+        # limité aux attributs utiles (pas les commentaires)
         response = table.get_item(
-            Key={"technicien_phone": phone, "reference": reference}
+            Key={"technicien_phone": phone, "reference": reference},
+            ProjectionExpression="#r, images",
+            ExpressionAttributeNames={"#r": "reference"}
         )
 
         if "Item" not in response:
@@ -1,7 +1,9 @@
 import httpx
 import logging
-from typing import Dict, Any
+import orjson
+from typing import Dict, Any, Optional
 from base64 import b64encode
+from functools import lru_cache
 
 from core.config import settings
 
@@ -9,9 +11,32 @@ logger = logging.getLogger(__name__)
 
 TWILIO_API_URL = "https://api.twilio.com/2010-04-01"
 
+# Client HTTP partagé : connexions keep-alive réutilisées entre les envois
+_client: Optional[httpx.AsyncClient] = None
 
+
+def get_client() -> httpx.AsyncClient:
+    """Retourne le client HTTP d'envoi Twilio (créé au premier appel)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Ferme le client HTTP partagé (arrêt de l'application)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@lru_cache(maxsize=1)
 def get_auth_header() -> str:
-    """Génère le header d'authentification Basic pour Twilio."""
+    """Génère le header d'authentification Basic pour Twilio (une seule fois)."""
     credentials = f"{settings.twilio_account_sid}:{settings.twilio_auth_token}"
     encoded = b64encode(credentials.encode()).decode()
     return f"Basic {encoded}"
@@ -50,15 +75,14 @@ async def send_whatsapp_message(to: str, message: str) -> Dict[str, Any]:
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, data=data, headers=headers)
+        response = await get_client().post(url, data=data, headers=headers)
 
-            if response.status_code in [200, 201]:
-                logger.info(f"Message sent successfully to {to}")
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Failed to send message: {response.text}")
-                return {"success": False, "error": response.text}
+        if response.status_code in [200, 201]:
+            logger.info(f"Message sent successfully to {to}")
+            return {"success": True, "data": orjson.loads(response.content)}
+        else:
+            logger.error(f"Failed to send message: {response.text}")
+            return {"success": False, "error": response.text}
 
     except Exception as e:
         logger.error(f"Error sending WhatsApp message: {e}")
@@ -103,15 +127,14 @@ async def send_whatsapp_media(
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, data=data, headers=headers)
+        response = await get_client().post(url, data=data, headers=headers)
 
-            if response.status_code in [200, 201]:
-                logger.info(f"Media sent successfully to {to}")
-                return {"success": True, "data": response.json()}
-            else:
-                logger.error(f"Failed to send media: {response.text}")
-                return {"success": False, "error": response.text}
+        if response.status_code in [200, 201]:
+            logger.info(f"Media sent successfully to {to}")
+            return {"success": True, "data": orjson.loads(response.content)}
+        else:
+            logger.error(f"Failed to send media: {response.text}")
+            return {"success": False, "error": response.text}
 
     except Exception as e:
         logger.error(f"Error sending WhatsApp media: {e}")
@@ -128,21 +151,24 @@ def parse_incoming_webhook(form_data: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Dict avec les informations extraites du message
     """
+    num_media = int(form_data.get("NumMedia", 0))
+    media_urls = []
+    media_types = []
+    for i in range(num_media):
+        url = form_data.get(f"MediaUrl{i}")
+        content_type = form_data.get(f"MediaContentType{i}")
+        if url:
+            media_urls.append(url)
+        if content_type:
+            media_types.append(content_type)
+
     return {
         "from": form_data.get("From", ""),
         "to": form_data.get("To", ""),
         "body": form_data.get("Body", ""),
-        "num_media": int(form_data.get("NumMedia", 0)),
-        "media_urls": [
-            form_data.get(f"MediaUrl{i}")
-            for i in range(int(form_data.get("NumMedia", 0)))
-            if form_data.get(f"MediaUrl{i}")
-        ],
-        "media_types": [
-            form_data.get(f"MediaContentType{i}")
-            for i in range(int(form_data.get("NumMedia", 0)))
-            if form_data.get(f"MediaContentType{i}")
-        ],
+        "num_media": num_media,
+        "media_urls": media_urls,
+        "media_types": media_types,
         "message_sid": form_data.get("MessageSid", ""),
         "account_sid": form_data.get("AccountSid", ""),
     }